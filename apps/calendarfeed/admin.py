@@ -0,0 +1,28 @@
+from django.contrib import admin
+from django.urls import reverse
+from django.utils.html import format_html
+
+from .models import CalendarToken
+
+
+@admin.register(CalendarToken)
+class CalendarTokenAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for calendar feed tokens.
+    """
+
+    list_display = ("__str__", "scope", "site", "technician", "organization", "days_back", "days_ahead", "is_active")
+    list_filter = ("scope", "is_active")
+    search_fields = ("name", "site__name", "technician__email", "organization__name")
+    readonly_fields = ("feed_url", "created_at", "updated_at")
+    fields = (
+        "name", "scope", "site", "technician", "organization",
+        "days_back", "days_ahead", "is_active", "token", "feed_url", "created_at", "updated_at",
+    )
+
+    @admin.display(description="Feed URL")
+    def feed_url(self, obj):
+        if not obj.pk:
+            return "-"
+        path = reverse("calendar-ics", args=[obj.token])
+        return format_html('<a href="{}">{}</a>', path, path)
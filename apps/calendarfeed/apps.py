@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+class CalendarfeedConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "apps.calendarfeed"
+    verbose_name = "Calendar Feeds"
+
+    def ready(self):
+        from . import signals  # noqa: F401
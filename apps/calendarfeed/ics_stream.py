@@ -0,0 +1,81 @@
+"""
+Streaming iCalendar writer for work-order feeds.
+
+Produces the same text the ics 0.7 Calendar/Event serializer does for our events
+(property order, escaping, CRLF line ends, no trailing newline) from `values()` rows
+fetched with `.iterator()`, so memory stays flat however long the feed is. UIDs are
+derived from the work-order id rather than random, so clients keep events stable
+across refreshes.
+"""
+from datetime import timezone as dt_timezone
+from typing import Iterator
+
+from ics.utils import escape_string
+
+PRODID = "ics.py - http://git.io/lLljaA"  # what ics 0.7 writes; kept so clients see no change
+HEADER = f"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:{PRODID}\r\n"
+FOOTER = "END:VCALENDAR"
+UID_DOMAIN = "maint-scheduler"
+
+FIELDS = (
+    "id",
+    "type",
+    "status",
+    "priority",
+    "due_by",
+    "completed_at",
+    "robot__model",
+    "robot__serial",
+    "site__name",
+    "assigned_to_id",
+    "assigned_to__email",
+    "policy_id",
+    "policy__name",
+)
+
+
+def _utc(value) -> str:
+    return value.astimezone(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def vevent(row: dict) -> str:
+    """
+    One VEVENT block for a `values(*FIELDS)` row.
+    """
+    lines = [
+        f"Work Order: WO#{row['id']}",
+        f"Site: {row['site__name']}",
+        f"Status: {row['status']}",
+        f"Priority: {row['priority']}",
+        f"Assigned: {row['assigned_to__email'] if row['assigned_to_id'] is not None else 'Unassigned'}",
+    ]
+    if row["policy_id"] is not None:
+        lines.append(f"Policy: {row['policy__name']}")
+    if row["completed_at"]:
+        lines.append(f"Completed at: {row['completed_at'].isoformat()}")
+    summary = f"{row['robot__model']}#{row['robot__serial']} — {row['type']}"
+    return (
+        "BEGIN:VEVENT\r\n"
+        f"DESCRIPTION:{escape_string(chr(10).join(lines))}\r\n"
+        "DURATION:PT1H\r\n"
+        f"DTSTART:{_utc(row['due_by'])}\r\n"
+        f"SUMMARY:{escape_string(summary)}\r\n"
+        f"UID:wo-{row['id']}@{UID_DOMAIN}\r\n"
+        "END:VEVENT\r\n"
+    )
+
+
+def iter_calendar(qs, chunk_size: int = 2000) -> Iterator[str]:
+    """
+    Yield the calendar for a WorkOrder queryset in pieces of about `chunk_size` events.
+    """
+    yield HEADER
+    rows = qs.order_by("due_by", "id").values(*FIELDS).iterator(chunk_size=chunk_size)
+    buffer = []
+    for row in rows:
+        buffer.append(vevent(row))
+        if len(buffer) >= chunk_size:
+            yield "".join(buffer)
+            buffer = []
+    buffer.append(FOOTER)
+    yield "".join(buffer)
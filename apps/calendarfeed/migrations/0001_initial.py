@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:52
+
+import apps.calendarfeed.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('fleet', '0007_site_organization'),
+        ('portal', '0003_ticketcomment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(default=apps.calendarfeed.models.generate_token, max_length=64, unique=True)),
+                ('name', models.CharField(blank=True, max_length=120)),
+                ('scope', models.CharField(choices=[('all', 'Whole fleet'), ('site', 'Site'), ('technician', 'Technician'), ('organization', 'Organization')], default='site', max_length=16)),
+                ('days_back', models.PositiveIntegerField(blank=True, null=True)),
+                ('days_ahead', models.PositiveIntegerField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('organization', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='portal.organization')),
+                ('site', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='fleet.site')),
+                ('technician', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='calendar_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,87 @@
+import secrets
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.utils import timezone
+
+
+def generate_token() -> str:
+    return secrets.token_urlsafe(24)
+
+
+class CalendarToken(models.Model):
+    """
+    A secret feed URL (/calendar/<token>.ics) scoped to the whole fleet, one site,
+    one technician's assignments, or every site of an organization.
+    The optional rolling window keeps long-lived subscriptions to recent and upcoming orders.
+    """
+
+    SCOPE_ALL = "all"
+    SCOPE_SITE = "site"
+    SCOPE_TECHNICIAN = "technician"
+    SCOPE_ORGANIZATION = "organization"
+    SCOPE_CHOICES = (
+        (SCOPE_ALL, "Whole fleet"),
+        (SCOPE_SITE, "Site"),
+        (SCOPE_TECHNICIAN, "Technician"),
+        (SCOPE_ORGANIZATION, "Organization"),
+    )
+
+    token = models.CharField(max_length=64, unique=True, default=generate_token)
+    name = models.CharField(max_length=120, blank=True)  # who/what the link was handed out to
+    scope = models.CharField(max_length=16, choices=SCOPE_CHOICES, default=SCOPE_SITE)
+    site = models.ForeignKey("fleet.Site", on_delete=models.CASCADE, null=True, blank=True)
+    technician = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name="calendar_tokens"
+    )
+    organization = models.ForeignKey("portal.Organization", on_delete=models.CASCADE, null=True, blank=True)
+
+    # Rolling window in whole days around today (UTC); empty = unbounded on that side.
+    days_back = models.PositiveIntegerField(null=True, blank=True)
+    days_ahead = models.PositiveIntegerField(null=True, blank=True)
+
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def clean(self):
+        target = {
+            self.SCOPE_SITE: "site",
+            self.SCOPE_TECHNICIAN: "technician",
+            self.SCOPE_ORGANIZATION: "organization",
+        }.get(self.scope)
+        if target and getattr(self, f"{target}_id") is None:
+            raise ValidationError({target: f"Required for the {self.get_scope_display().lower()} scope."})
+
+    def window(self, now=None) -> tuple:
+        """
+        (start, end) due_by bounds; either may be None. Day-aligned, so a feed's content
+        (and its cache key) only moves once a day.
+        """
+        today = (now or timezone.now()).astimezone(dt_timezone.utc).date()
+        midnight = datetime.combine(today, time.min, tzinfo=dt_timezone.utc)
+        start = midnight - timedelta(days=self.days_back) if self.days_back is not None else None
+        end = midnight + timedelta(days=self.days_ahead + 1) if self.days_ahead is not None else None
+        return start, end
+
+    def filter_workorders(self, qs, now=None):
+        """
+        Narrow a WorkOrder queryset to this token's slice; filters on FK ids and due_by only.
+        """
+        if self.scope == self.SCOPE_SITE:
+            qs = qs.filter(site_id=self.site_id)
+        elif self.scope == self.SCOPE_TECHNICIAN:
+            qs = qs.filter(assigned_to_id=self.technician_id)
+        elif self.scope == self.SCOPE_ORGANIZATION:
+            qs = qs.filter(site__organization_id=self.organization_id)
+        start, end = self.window(now)
+        if start is not None:
+            qs = qs.filter(due_by__gte=start)
+        if end is not None:
+            qs = qs.filter(due_by__lt=end)
+        return qs
+
+    def __str__(self) -> str:
+        return self.name or f"{self.get_scope_display()} feed #{self.pk}"
@@ -0,0 +1,13 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import CalendarToken
+from .tokens import invalidate_tokens
+
+
+@receiver(post_save, sender=CalendarToken)
+@receiver(post_delete, sender=CalendarToken)
+def token_changed(sender, instance: CalendarToken, **kwargs):
+    # After commit, so a resolve in between cannot re-cache the old row under the new version.
+    transaction.on_commit(invalidate_tokens)
@@ -0,0 +1,48 @@
+"""
+In-process cache of active CalendarTokens, keyed by the secret.
+
+Feeds are polled every few minutes per subscriber, so resolving a token should not cost
+a lookup by secret each time. Each process keeps the tokens it has seen, stamped with a
+version read from the database (token count plus newest updated_at) on every resolve:
+one aggregate over a small table. Any save or delete moves the version, so every process
+drops its copies on its next resolve. A save that commits late with an updated_at older
+than one already counted cannot move the version; TOKEN_MAX_AGE bounds how long such a
+change goes unseen. Bulk queryset.update() bypasses updated_at and is not picked up
+until then either.
+"""
+import time
+from typing import Optional
+
+from maint_app.versioning import fingerprint
+from .models import CalendarToken
+
+TOKEN_MAX_AGE = 60.0
+
+_tokens: dict = {}
+_tokens_version = None
+_tokens_loaded_at = 0.0
+
+
+def resolve_token(token: str) -> Optional[CalendarToken]:
+    """
+    The active CalendarToken for `token`, or None. Misses are not cached.
+    """
+    global _tokens, _tokens_version, _tokens_loaded_at
+    version = fingerprint(CalendarToken.objects.all())
+    if version != _tokens_version or time.monotonic() - _tokens_loaded_at > TOKEN_MAX_AGE:
+        _tokens, _tokens_version, _tokens_loaded_at = {}, version, time.monotonic()
+    found = _tokens.get(token)
+    if found is None:
+        found = CalendarToken.objects.filter(token=token, is_active=True).first()
+        if found is not None:
+            _tokens[token] = found
+    return found
+
+
+def invalidate_tokens() -> None:
+    """
+    Drop this process's cached tokens; other processes see the new version on their
+    next resolve.
+    """
+    global _tokens, _tokens_version
+    _tokens, _tokens_version = {}, None
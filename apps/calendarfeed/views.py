@@ -1,66 +1,102 @@
-from django.http import HttpResponse, Http404
+import hashlib
+
+from django.core.cache import cache
+from django.http import HttpResponse, Http404, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from ics import Calendar, Event
 
 from apps.workorders.models import WorkOrder
+from maint_app.versioning import fingerprint
+from .ics_stream import iter_calendar
 from .serializers import WorkOrderCalendarSerializer
+from .tokens import resolve_token
 
-# Simple token map for v1; replace with a DB model later.
-VALID_TOKENS = {
-    "demo-token": {"scope": "all"},
-    # "site-excyte": {"site_name": "Excyte"},
-    # "tech-alex": {"assigned_to_email": "alex@fieldai.com"},
-}
+FEED_CACHE_TIMEOUT = 60 * 60
+FEED_CACHE_MAX_BYTES = 2 * 1024 * 1024
+FEED_CHUNK_SIZE = 2000
 
 
 def _filter_workorders_by_token(token: str):
-    meta = VALID_TOKENS.get(token)
-    if not meta:
+    """
+    The token's slice of work orders, or None for an unknown/inactive token.
+    """
+    calendar_token = resolve_token(token)
+    if calendar_token is None:
         return None
-
     qs = WorkOrder.objects.select_related("robot", "site", "assigned_to", "completed_by", "policy")
+    return calendar_token.filter_workorders(qs)
 
-    if meta.get("scope") == "all":
-        return qs
 
-    if "assigned_to_email" in meta:
-        return qs.filter(assigned_to__email=meta["assigned_to_email"])
-
-    if "site_name" in meta:
-        return qs.filter(site__name=meta["site_name"])
-
-    return qs
+def _feed_version(qs, salt=()) -> tuple:
+    """
+    (etag, last_modified epoch) for a feed queryset, from one aggregate: row count plus the
+    newest updated_at of the orders and of the sites, robots and policies they render.
+    `salt` covers what the aggregate cannot see, e.g. the token's settings and window.
+    """
+    n, *stamps = fingerprint(qs, "updated_at", "site__updated_at", "robot__updated_at", "policy__updated_at")
+    present = [ts for ts in stamps if ts]
+    last_modified = int(max(present).timestamp()) if present else None
+    key = repr((n, [ts and ts.isoformat() for ts in stamps], salt))
+    return hashlib.md5(key.encode()).hexdigest(), last_modified
 
 
 def ics_feed(request, token: str):
-    qs = _filter_workorders_by_token(token)
-    if qs is None:
+    """
+    Calendar clients poll this every few minutes: a poll costs two aggregate queries (the
+    token cache's version, see tokens.py, and the feed's), answers If-None-Match /
+    If-Modified-Since with 304, and otherwise serves the body cached under the feed's
+    version. After a change the feed is streamed (see ics_stream).
+    """
+    calendar_token = resolve_token(token)
+    if calendar_token is None:
         raise Http404("Invalid calendar token")
-
-    cal = Calendar()
-    for wo in qs:
-        e = Event()
-        e.name = f"{wo.robot.model}#{wo.robot.serial} — {wo.type}"
-        e.begin = wo.due_by
-        e.duration = {"hours": 1}
-        lines = [
-            f"Work Order: WO#{wo.id}",
-            f"Site: {wo.site.name}",
-            f"Status: {wo.status}",
-            f"Priority: {wo.priority}",
-            f"Assigned: {getattr(wo.assigned_to, 'email', 'Unassigned')}",
-        ]
-        if wo.policy:
-            lines.append(f"Policy: {wo.policy.name}")
-        if wo.completed_at:
-            lines.append(f"Completed at: {wo.completed_at.isoformat()}")
-        e.description = "\n".join(lines)
-        cal.events.add(e)
-
-    return HttpResponse(str(cal), content_type="text/calendar")
+    qs = calendar_token.filter_workorders(WorkOrder.objects.all())
+
+    salt = (calendar_token.pk, calendar_token.updated_at.isoformat(), repr(calendar_token.window()))
+    version, last_modified = _feed_version(qs, salt)
+    etag = f'"{version}"'
+    response = HttpResponse(content_type="text/calendar")
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=last_modified, response=response)
+    if conditional is not response:
+        return conditional
+
+    key = f"calendarfeed:ics:{hashlib.md5(token.encode()).hexdigest()}:{version}"
+    body = cache.get(key)
+    if body is not None:
+        response.content = body
+        return response
+
+    streaming = StreamingHttpResponse(_stream_and_cache(qs, key), content_type="text/calendar")
+    for header in ("ETag", "Last-Modified"):
+        if header in response.headers:
+            streaming.headers[header] = response.headers[header]
+    return streaming
+
+
+def _stream_and_cache(qs, key: str):
+    """
+    Stream the feed; keep a copy for the cache only while it stays under FEED_CACHE_MAX_BYTES,
+    so large feeds never build the whole body in memory.
+    """
+    kept, size = [], 0
+    for piece in iter_calendar(qs, FEED_CHUNK_SIZE):
+        if kept is not None:
+            size += len(piece)
+            if size <= FEED_CACHE_MAX_BYTES:
+                kept.append(piece)
+            else:
+                kept = None
+        yield piece
+    if kept is not None:
+        cache.set(key, "".join(kept), FEED_CACHE_TIMEOUT)
 
 
 class UpcomingEventsViewSet(viewsets.ReadOnlyModelViewSet):
@@ -69,6 +105,7 @@ class UpcomingEventsViewSet(viewsets.ReadOnlyModelViewSet):
     """
     serializer_class = WorkOrderCalendarSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ("due_by", "id")
 
     def get_queryset(self):
         token = self.request.query_params.get("token")
@@ -81,12 +118,13 @@ class UpcomingEventsViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=["get"])
     def all(self, request):
         """
-        Optional: include past + future.
-        GET /api/calendar/events/all/?token=...
+        Optional: include past + future, newest first, one page at a time.
+        GET /api/calendar/events/all/?token=...&page_size=...  (follow "next" for older orders)
         """
         token = request.query_params.get("token")
         qs = _filter_workorders_by_token(token)
         if qs is None:
             return Response([], status=status.HTTP_200_OK)
-        data = self.get_serializer(qs.order_by("-due_by"), many=True).data
-        return Response(data, status=status.HTTP_200_OK)
+        self.cursor_ordering = ("-due_by", "-id")
+        page = self.paginate_queryset(qs)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
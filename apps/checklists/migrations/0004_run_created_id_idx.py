@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checklists', '0003_rename_updated_at_checklistrun_created_at'),
+        ('workorders', '0006_calendar_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='checklistrun',
+            index=models.Index(fields=['created_at', 'id'], name='run_created_id_idx'),
+        ),
+    ]
@@ -41,5 +41,11 @@ class ChecklistRun(models.Model):
     signed_by  = models.ForeignKey('auth.User', null=True, blank=True, on_delete=models.SET_NULL)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # API list ordering / keyset pagination
+            models.Index(fields=["created_at", "id"], name="run_created_id_idx"),
+        ]
+
     def __str__(self) -> str:
         return f"ChecklistRun for WO#{self.work_order.id}"
@@ -16,6 +16,7 @@ class ChecklistTemplateViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = ChecklistTemplate.objects.all()
     serializer_class = ChecklistTemplateSerializer
     permission_classes = [IsAuthenticated]
+    cursor_ordering = ("checklist_id",)
 
 
 class ChecklistRunViewSet(viewsets.ModelViewSet):
@@ -25,6 +26,7 @@ class ChecklistRunViewSet(viewsets.ModelViewSet):
     queryset = ChecklistRun.objects.all().select_related("work_order", "template", "signed_by")
     serializer_class = ChecklistRunSerializer
     permission_classes = [IsAuthenticated]
+    cursor_ordering = ("-created_at", "-id")
 
     @action(detail=False, methods=["post"], url_path="submit")
     def submit_checklist(self, request):
@@ -14,7 +14,7 @@ class SiteAdminForm(forms.ModelForm):
 
     class Meta:
         model = Site
-        fields = ["name", "tz", "address", "flags_text"]
+        fields = ["name", "organization", "tz", "address", "daily_capacity", "flags_text"]
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -42,7 +42,8 @@ class SiteAdminForm(forms.ModelForm):
 class SiteAdmin(admin.ModelAdmin):
     form = SiteAdminForm
     exclude = ["flags"]
-    list_display = ("name", "tz")
+    list_display = ("name", "organization", "tz", "daily_capacity")
+    list_filter = ("organization",)
     search_fields = ("name", "tz", "address")
 
 
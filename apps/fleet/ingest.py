@@ -0,0 +1,197 @@
+import json
+import logging
+import math
+import time
+from datetime import datetime, timezone as dt_timezone
+from typing import Iterable, Optional
+
+from django.db import connection, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal
+from django.utils.dateparse import parse_datetime
+
+from .models import Robot, CounterReading
+
+# Sent after each batch commits, with rows=[(robot_id, counter, value, recorded_at), ...].
+readings_ingested = Signal()
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 5000
+MAX_BATCH_SIZE = 20000  # caps what a caller can ask for, so memory stays bounded
+MAX_REJECT_DETAILS = 1000  # rejected rows beyond this are counted but not itemised
+
+
+class SerialCache:
+    """
+    In-process serial -> robot id map. Misses are resolved in one query per batch;
+    the whole map is dropped after `ttl` seconds or when it grows past `max_size`.
+    """
+
+    def __init__(self, max_size: int = 200_000, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._ids = {}
+        self._loaded_at = time.monotonic()
+
+    def clear(self) -> None:
+        self._ids.clear()
+        self._loaded_at = time.monotonic()
+
+    def discard(self, serial: str) -> None:
+        self._ids.pop(serial, None)
+
+    def resolve(self, serials: Iterable[str]) -> dict:
+        if time.monotonic() - self._loaded_at > self.ttl or len(self._ids) > self.max_size:
+            self.clear()
+        missing = {s for s in serials if s not in self._ids}
+        if missing:
+            self._ids.update(Robot.objects.filter(serial__in=missing).values_list("serial", "id"))
+        return self._ids
+
+
+serial_cache = SerialCache()
+
+
+def _forget_robot(sender, instance: Robot, **kwargs):
+    serial_cache.discard(instance.serial)
+    if not kwargs.get("created", True):
+        # The serial may have changed; we don't know the old one.
+        serial_cache.clear()
+
+
+post_save.connect(_forget_robot, sender=Robot, dispatch_uid="fleet-ingest-serial-cache-save")
+post_delete.connect(_forget_robot, sender=Robot, dispatch_uid="fleet-ingest-serial-cache-delete")
+
+
+def _parse_timestamp(value) -> Optional[datetime]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value, tz=dt_timezone.utc)
+    if isinstance(value, str):
+        dt = parse_datetime(value)
+        if dt is not None and dt.tzinfo is None:
+            dt = dt.replace(tzinfo=dt_timezone.utc)
+        return dt
+    return None
+
+
+def parse_reading(record) -> tuple:
+    """
+    Validate one decoded NDJSON record; returns (serial, counter, value, recorded_at)
+    or raises ValueError with a short reason.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("record is not an object")
+    serial = record.get("serial")
+    if not isinstance(serial, str) or not serial:
+        raise ValueError("missing serial")
+    counter = record.get("counter")
+    if not isinstance(counter, str) or not counter or len(counter) > 32:
+        raise ValueError("invalid counter")
+    value = record.get("value")
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError("invalid value")
+    try:
+        recorded_at = _parse_timestamp(record.get("timestamp"))
+    except (ValueError, OverflowError, OSError):
+        recorded_at = None
+    if recorded_at is None:
+        raise ValueError("invalid timestamp")
+    return serial, counter, float(value), recorded_at
+
+
+def write_readings(rows: list) -> None:
+    """
+    Append (robot_id, counter, value, recorded_at) rows: COPY on PostgreSQL,
+    executemany elsewhere.
+    """
+    table = connection.ops.quote_name(CounterReading._meta.db_table)
+    columns = "robot_id, counter, value, recorded_at"
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            with cursor.copy(f"COPY {table} ({columns}) FROM STDIN") as copy:
+                for row in rows:
+                    copy.write_row(row)
+        else:
+            adapt = connection.ops.adapt_datetimefield_value
+            cursor.executemany(
+                f"INSERT INTO {table} ({columns}) VALUES (%s, %s, %s, %s)",
+                [(robot_id, counter, value, adapt(ts)) for robot_id, counter, value, ts in rows],
+            )
+
+
+class ReadingIngestor:
+    """
+    Streams NDJSON counter readings into CounterReading in fixed-size batches.
+
+    Memory stays bounded by `batch_size`; bad lines are rejected (and itemised up to
+    MAX_REJECT_DETAILS) without aborting the batch they belong to.
+    """
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE, cache: SerialCache = serial_cache):
+        self.batch_size = min(max(1, batch_size), MAX_BATCH_SIZE)
+        self.cache = cache
+        self.accepted = 0
+        self.rejected = 0
+        self.errors = []
+        self._pending = []  # (line_no, serial, counter, value, recorded_at)
+
+    def _reject(self, line_no: int, reason: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_REJECT_DETAILS:
+            self.errors.append({"line": line_no, "error": reason})
+
+    def feed(self, lines: Iterable) -> "ReadingIngestor":
+        for line_no, line in enumerate(lines, start=1):
+            if isinstance(line, bytes):
+                line = line.decode("utf-8", errors="replace")
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                self._reject(line_no, "invalid JSON")
+                continue
+            try:
+                self._pending.append((line_no, *parse_reading(record)))
+            except ValueError as e:
+                self._reject(line_no, str(e))
+                continue
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+        return self
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        ids = self.cache.resolve({p[1] for p in pending})
+
+        rows = []
+        for line_no, serial, counter, value, recorded_at in pending:
+            robot_id = ids.get(serial)
+            if robot_id is None:
+                self._reject(line_no, f"unknown serial {serial!r}")
+                continue
+            rows.append((robot_id, counter, value, recorded_at))
+
+        if rows:
+            with transaction.atomic():
+                write_readings(rows)
+            self.accepted += len(rows)
+            # The batch is already stored; a failing receiver must not abort the rest of the stream.
+            for receiver, result in readings_ingested.send_robust(sender=CounterReading, rows=rows):
+                if isinstance(result, Exception):
+                    log.error("readings_ingested receiver %r failed", receiver, exc_info=result)
+
+    def close(self) -> dict:
+        self.flush()
+        return self.summary()
+
+    def summary(self) -> dict:
+        return {"accepted": self.accepted, "rejected": self.rejected, "errors": self.errors}
+
+
+def ingest_ndjson(lines: Iterable, batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+    return ReadingIngestor(batch_size=batch_size).feed(lines).close()
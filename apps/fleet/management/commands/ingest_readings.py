@@ -0,0 +1,39 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.fleet.ingest import ReadingIngestor, DEFAULT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Ingest NDJSON counter readings (serial, counter, value, timestamp) from a file or stdin."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default="-", help="NDJSON file, or '-' for stdin")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument("--show-errors", type=int, default=20, help="Rejected rows to print")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        started = time.perf_counter()
+        ingestor = ReadingIngestor(batch_size=options["batch_size"])
+
+        if path == "-":
+            summary = ingestor.feed(sys.stdin.buffer).close()
+        else:
+            try:
+                with open(path, "rb") as fh:
+                    summary = ingestor.feed(fh).close()
+            except FileNotFoundError:
+                raise CommandError(f"No such file: {path}")
+
+        elapsed = time.perf_counter() - started
+        total = summary["accepted"] + summary["rejected"]
+        rate = total / elapsed if elapsed else 0
+        for err in summary["errors"][: options["show_errors"]]:
+            self.stdout.write(self.style.WARNING(f"line {err['line']}: {err['error']}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Accepted {summary['accepted']}, rejected {summary['rejected']} "
+            f"in {elapsed:.2f}s ({rate:,.0f} readings/s)"
+        ))
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0004_robot_updated_at_site_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CounterReading',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('counter', models.CharField(max_length=32)),
+                ('value', models.FloatField()),
+                ('recorded_at', models.DateTimeField()),
+                ('robot', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='fleet.robot')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['robot', 'counter', 'recorded_at'], name='reading_robot_counter_ts_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0005_counterreading'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='site',
+            name='daily_capacity',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
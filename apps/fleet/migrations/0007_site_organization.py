@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0006_site_daily_capacity'),
+        ('portal', '0003_ticketcomment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='site',
+            name='organization',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sites', to='portal.organization'),
+        ),
+    ]
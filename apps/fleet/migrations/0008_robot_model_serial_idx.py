@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0007_site_organization'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='robot',
+            index=models.Index(fields=['model', 'serial'], name='robot_model_serial_idx'),
+        ),
+    ]
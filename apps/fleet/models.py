@@ -10,6 +10,11 @@ class Site(models.Model):
     address = models.TextField(blank=True)
     flags = models.JSONField(blank=True, default=list)  # e.g., {"dusty": True}
     slack_channel = models.CharField(max_length=120, blank=True)
+    daily_capacity = models.PositiveIntegerField(null=True, blank=True)  # max work orders per day; empty = unlimited
+    organization = models.ForeignKey(
+        "portal.Organization", on_delete=models.SET_NULL, null=True, blank=True, related_name="sites"
+    )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # change feed for the incremental planner
 
     def __str__(self) -> str:
         return self.name
@@ -26,6 +31,32 @@ class Robot(models.Model):
     environments = models.JSONField(blank=True, null=True, default=list)        # e.g., {"dusty": True}
     status = models.CharField(max_length=32, default="active")  # active, in_maintenance, retired
     last_maintained = models.DateField(null=True, blank=True)  # NEW
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # change feed for the incremental planner
+
+    class Meta:
+        indexes = [
+            # API list ordering / keyset pagination
+            models.Index(fields=["model", "serial"], name="robot_model_serial_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.model}#{self.serial}"
+
+
+class CounterReading(models.Model):
+    """
+    One usage-counter sample reported by a robot, e.g. ("hours", 1.5).
+    Append-only; written in bulk by apps.fleet.ingest.
+    """
+    robot = models.ForeignKey(Robot, on_delete=models.CASCADE, db_index=False)  # covered by the index below
+    counter = models.CharField(max_length=32)    # matches MaintenancePolicy.counter
+    value = models.FloatField()
+    recorded_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["robot", "counter", "recorded_at"], name="reading_robot_counter_ts_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.robot_id}:{self.counter}={self.value} @ {self.recorded_at:%Y-%m-%d %H:%M}"
@@ -7,4 +7,7 @@ router = DefaultRouter()
 router.register(r'robots', views.RobotViewSet, basename='robot')
 router.register(r'sites', views.SiteViewSet, basename='site')
 
-urlpatterns = [path("", include(router.urls))]
+urlpatterns = [
+    path("readings/ingest/", views.CounterReadingIngestView.as_view(), name="readings-ingest"),
+    path("", include(router.urls)),
+]
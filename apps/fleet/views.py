@@ -1,16 +1,20 @@
-from rest_framework import viewsets
+from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
 
 from .models import Site, Robot
 from .serializers import SiteSerializer, RobotSerializer
+from .ingest import ReadingIngestor, DEFAULT_BATCH_SIZE
 
 
 class SiteViewSet(viewsets.ModelViewSet):
     queryset = Site.objects.all().order_by("name")
     serializer_class = SiteSerializer
     permission_classes = [IsAuthenticated]
+    cursor_ordering = ("name", "id")
 
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     # remove "flags" from here:
@@ -26,9 +30,34 @@ class RobotViewSet(viewsets.ModelViewSet):
     queryset = Robot.objects.select_related("site").all().order_by("model", "serial")
     serializer_class = RobotSerializer
     permission_classes = [IsAuthenticated]
+    cursor_ordering = ("model", "serial")
 
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ["site", "model", "tier", "status"]   # exact filters
     search_fields = ["model", "serial", "site__name"]        # free-text search
     ordering_fields = ["model", "serial", "tier", "status"]
 
+
+class CounterReadingIngestView(APIView):
+    """
+    Bulk counter-reading ingestion.
+    POST /api/fleet/readings/ingest/ with an NDJSON body, one reading per line:
+      {"serial": "F28-0001", "counter": "hours", "value": 1.5, "timestamp": "2025-09-01T12:00:00Z"}
+    Bad lines are reported back without failing the rest of the upload.
+    ?batch_size= (default DEFAULT_BATCH_SIZE) is clamped to MAX_BATCH_SIZE; anything but a
+    positive integer is a 400.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        try:
+            batch_size = int(request.query_params.get("batch_size") or DEFAULT_BATCH_SIZE)
+        except ValueError:
+            return Response({"error": "batch_size must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        if batch_size < 1:
+            return Response({"error": "batch_size must be positive"}, status=status.HTTP_400_BAD_REQUEST)
+        # Larger requests are clamped to MAX_BATCH_SIZE by the ingestor.
+        ingestor = ReadingIngestor(batch_size=batch_size)
+        # Read the raw stream line by line instead of request.data so the body is never buffered whole.
+        summary = ingestor.feed(request.stream or []).close()
+        return Response(summary, status=status.HTTP_200_OK)
@@ -1,9 +1,9 @@
 # apps/notifications/admin.py
 from django.contrib import admin, messages
 from django import forms
-from django.db import transaction
 import json
-from .models import NotificationLog, STATUS_QUEUED
+from .models import NotificationLog, STATUS_QUEUED, STATUS_SENDING
+from .tasks import queue_dispatch
 
 class NotificationLogAdminForm(forms.ModelForm):
     # Human-friendly field instead of raw JSON
@@ -70,33 +70,27 @@ class NotificationLogAdmin(admin.ModelAdmin):
     list_display = ("created_at", "channel", "to", "subject", "status", "sent_at")
     list_filter = ("channel", "status")
     search_fields = ("subject", "message", "to")
-    readonly_fields = ("error", "sent_at", "created_at")
+    readonly_fields = ("error", "sent_at", "claimed_at", "created_at")
     actions = ["send_now"]
 
     def save_model(self, request, obj, form, change):
         super().save_model(request, obj, form, change)
 
-        # Auto-send ONLY if it's queued (so edits won't re-send)
+        # Queued rows go to the outbox worker (new rows are kicked by the post_save signal)
         if obj.status == STATUS_QUEUED:
-            # Safer: send after the transaction commits
-            transaction.on_commit(lambda: self._send_and_flash(request, obj))
-
-    def _send_and_flash(self, request, obj: NotificationLog):
-        if obj.send():
-            self.message_user(request, "Notification sent ✅", level=messages.SUCCESS)
-        else:
-            self.message_user(request, f"Notification failed: {obj.error or 'see logs'}", level=messages.ERROR)
+            if change:
+                queue_dispatch([obj.id])
+            self.message_user(request, "Notification queued for delivery", level=messages.INFO)
 
     def send_now(self, request, queryset):
-        ok = fail = 0
-        for obj in queryset:
-            if obj.send():
-                ok += 1
-            else:
-                fail += 1
-        if ok:
-            self.message_user(request, f"Sent {ok} notification(s) ✅", level=messages.SUCCESS)
-        if fail:
-            self.message_user(request, f"{fail} failed ❌", level=messages.ERROR)
+        ids = list(queryset.exclude(status=STATUS_SENDING).values_list("id", flat=True))
+        n = NotificationLog.objects.filter(id__in=ids).exclude(status=STATUS_SENDING).update(
+            status=STATUS_QUEUED, error=""
+        )
+        if n:
+            queue_dispatch(ids)
+            self.message_user(request, f"Queued {n} notification(s) for delivery ✅", level=messages.SUCCESS)
+        else:
+            self.message_user(request, "Nothing to send (already in flight)", level=messages.WARNING)
 
     send_now.short_description = "Send now"
@@ -0,0 +1,59 @@
+# apps/notifications/mailer.py
+"""
+Batched email delivery for NotificationLog rows.
+
+Rows are split into chunks of EMAIL_BATCH_SIZE; each chunk gets one SMTP connection
+(opened once, reused for every message, closed at the end) and up to EMAIL_CONCURRENCY
+chunks are sent in parallel. Outcomes are set on the instances for the caller to save.
+"""
+import smtplib
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.mail import get_connection
+
+from .models import STATUS_FAILED
+
+EMAIL_BATCH_SIZE = getattr(settings, "NOTIFICATIONS_EMAIL_BATCH_SIZE", 50)
+EMAIL_CONCURRENCY = getattr(settings, "NOTIFICATIONS_EMAIL_CONCURRENCY", 2)
+
+
+def _send_chunk(logs: list, connection_kwargs: dict) -> None:
+    connection = get_connection(fail_silently=False, **connection_kwargs)
+    try:
+        connection.open()
+    except Exception as e:
+        for log in logs:
+            log._set(STATUS_FAILED, f"Mail connection failed: {e}")
+        return
+    try:
+        for log in logs:
+            try:
+                log.deliver(connection=connection)
+            except smtplib.SMTPServerDisconnected:
+                # The server dropped us mid-batch: reconnect once and retry this row.
+                try:
+                    connection.close()
+                    connection.open()
+                    log.deliver(connection=connection)
+                except Exception as e:
+                    log._set(STATUS_FAILED, f"Mail connection lost: {e}")
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+def deliver_emails(logs: list, batch_size: int = EMAIL_BATCH_SIZE, concurrency: int = EMAIL_CONCURRENCY,
+                   **connection_kwargs) -> list:
+    """
+    Send email NotificationLogs over reused connections. `connection_kwargs` go to
+    get_connection (e.g. backend, host, port). Returns the logs.
+    """
+    logs = list(logs)
+    chunks = [logs[i:i + batch_size] for i in range(0, len(logs), max(1, batch_size))]
+    if not chunks:
+        return logs
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(chunks)))) as pool:
+        list(pool.map(lambda chunk: _send_chunk(chunk, connection_kwargs), chunks))
+    return logs
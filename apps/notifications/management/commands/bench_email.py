@@ -0,0 +1,61 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from apps.notifications.mailer import EMAIL_BATCH_SIZE, EMAIL_CONCURRENCY, deliver_emails
+from apps.notifications.models import NotificationLog, CHANNEL_EMAIL, STATUS_SENT
+from apps.notifications.smtp_standin import REJECT_MARKER, StandinSMTPServer
+
+SMTP_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+
+
+class Command(BaseCommand):
+    help = "Benchmark notification email delivery against a local SMTP stand-in (nothing is saved)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=500)
+        parser.add_argument("--latency-ms", type=float, default=2.0, help="Simulated server time per message")
+        parser.add_argument("--batch-size", type=int, default=EMAIL_BATCH_SIZE)
+        parser.add_argument("--concurrency", type=int, default=EMAIL_CONCURRENCY)
+        parser.add_argument("--reject-every", type=int, default=50, help="Every Nth row also has a refused recipient")
+
+    def handle(self, *args, **options):
+        n = options["messages"]
+
+        def rows():
+            logs = []
+            for i in range(n):
+                to = f"tech{i}@example.com"
+                if options["reject_every"] and i % options["reject_every"] == 0:
+                    to += f", {REJECT_MARKER}{i}@example.com"
+                logs.append(NotificationLog(channel=CHANNEL_EMAIL, to=to, subject="Reminder", message=f"WO#{i}"))
+            return logs
+
+        with StandinSMTPServer(latency=options["latency_ms"] / 1000.0) as smtp:
+            connection = {"backend": SMTP_BACKEND, "host": "127.0.0.1", "port": smtp.port, "use_tls": False,
+                          "username": "", "password": ""}
+            runs = [
+                # What a real send_email per row would do: an unopened connection opens and
+                # closes its own SMTP session for every message.
+                ("connection per message", lambda logs: [
+                    log._deliver_email(get_connection(**connection)) for log in logs
+                ]),
+                ("deliver_emails", lambda logs: deliver_emails(
+                    logs, batch_size=options["batch_size"], concurrency=options["concurrency"], **connection
+                )),
+            ]
+            for name, run in runs:
+                logs = rows()
+                before = (smtp.connections, smtp.messages)
+                started = time.perf_counter()
+                run(logs)
+                elapsed = time.perf_counter() - started
+                sent = sum(1 for log in logs if log.status == STATUS_SENT)
+                partial = sum(1 for log in logs if log.status == STATUS_SENT and log.error)
+                self.stdout.write(
+                    f"{name:<24} {sent}/{n} rows sent ({partial} with refused recipients), "
+                    f"{smtp.messages - before[1]} messages over {smtp.connections - before[0]} connection(s) "
+                    f"in {elapsed:.2f}s: {n / elapsed:,.0f} rows/s"
+                )
+        self.stdout.write(self.style.SUCCESS("Done"))
@@ -0,0 +1,76 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.checklists.models import ChecklistTemplate
+from apps.notifications import models as notification_models
+from apps.notifications.models import NotificationLog, CHANNEL_SLACK
+from apps.notifications.render import render_blocks
+from apps.policies.models import MaintenancePolicy
+from apps.workorders.planner import count_queries
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmark Slack block rendering per row vs. batched (synthetic rows, rolled back)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=1000)
+        parser.add_argument("--related", type=int, default=50, help="Distinct templates/policies to link")
+
+    def handle(self, *args, **options):
+        n = options["messages"]
+        try:
+            with transaction.atomic():
+                templates = [
+                    ChecklistTemplate.objects.create(checklist_id=f"bench-{i}", name=f"Bench {i}")
+                    for i in range(options["related"])
+                ]
+                policies = [MaintenancePolicy.objects.create(name=f"Bench {i}") for i in range(options["related"])]
+                NotificationLog.objects.bulk_create(
+                    [
+                        NotificationLog(
+                            channel=CHANNEL_SLACK,
+                            to="#bench",
+                            subject=f"Bench {i}",
+                            message="body",
+                            work_order_id=i + 1,
+                            checklist_template=templates[i % len(templates)],
+                            maintenance_policy=policies[i % len(policies)],
+                        )
+                        for i in range(n)
+                    ]
+                )
+                ids = list(NotificationLog.objects.filter(to="#bench").values_list("id", flat=True))
+
+                self._run("per row", lambda: [
+                    log._as_slack_blocks() for log in NotificationLog.objects.filter(id__in=ids)
+                ], n, cold=True)
+                self._run("render_blocks", lambda: render_blocks(NotificationLog.objects.filter(id__in=ids)), n)
+                raise _Rollback
+        except _Rollback:
+            pass
+        self.stdout.write(self.style.SUCCESS("Done (benchmark rows rolled back)"))
+
+    def _run(self, name, fn, n, cold=False):
+        if cold:
+            # What every message paid before: a reverse() per link.
+            notification_models._admin_change_url_parts.cache_clear()
+            original = notification_models._admin_change_url_parts
+            notification_models._admin_change_url_parts = original.__wrapped__
+        try:
+            started = time.perf_counter()
+            with count_queries() as queries:
+                fn()
+            elapsed = time.perf_counter() - started
+        finally:
+            if cold:
+                notification_models._admin_change_url_parts = original
+        per_k = 1000.0 / n
+        self.stdout.write(
+            f"{name:<14} {queries[0] * per_k:,.1f} queries and {elapsed * 1000 * per_k:,.1f} ms per 1,000 messages"
+        )
@@ -0,0 +1,74 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.core.management.base import BaseCommand
+
+from apps.notifications import utils
+from apps.notifications.ratelimit import RateLimiter
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like hooks.slack.com
+    disable_nagle_algorithm = True
+    latency = 0.0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.latency:
+            time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+class _Unlimited(RateLimiter):
+    def acquire(self, key: str, rate: float = 0, burst: float = 0) -> float:
+        return 0.0
+
+
+class Command(BaseCommand):
+    help = "Benchmark Slack webhook delivery against a local stand-in server (no Slack traffic)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=500)
+        parser.add_argument("--latency-ms", type=float, default=20.0, help="Simulated server time per message")
+        parser.add_argument("--concurrency", type=int, default=utils.HTTP_POOL_SIZE)
+
+    def handle(self, *args, **options):
+        _Handler.latency = options["latency_ms"] / 1000.0
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/hook"
+
+        n = options["messages"]
+        messages = [(f"#bench-{i % 10}", f"message {i}") for i in range(n)]
+        # Every message shares the webhook's rate bucket (about 1/s), so the limiter is
+        # switched off for the run: this measures the transport, not Slack's quota.
+        previous, utils.SLACK_WEBHOOK = utils.SLACK_WEBHOOK, url
+        previous_limiter, utils.limiter = utils.limiter, _Unlimited()
+        try:
+            runs = [
+                # What send_slack did before: a fresh connection per requests.post call.
+                ("requests.post per message", lambda: [
+                    requests.post(url, json=utils._webhook_body(label, text), timeout=10).ok for label, text in messages
+                ]),
+                ("pooled session, sequential", lambda: [utils.send_slack(label, text) for label, text in messages]),
+                ("send_slack_batch", lambda: utils.send_slack_batch(messages, concurrency=options["concurrency"])),
+            ]
+            for name, run in runs:
+                started = time.perf_counter()
+                ok = sum(run())
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"{name:<28} {ok}/{n} ok in {elapsed:.2f}s: {n / elapsed:,.0f} msg/s")
+        finally:
+            utils.SLACK_WEBHOOK = previous
+            utils.limiter = previous_limiter
+            server.shutdown()
+        self.stdout.write(self.style.SUCCESS("Done"))
@@ -1,20 +1,75 @@
 # apps/notifications/models.py
-from django.db import models
+import smtplib
+from django.db import IntegrityError, models, transaction
 from django.utils import timezone
 from django.conf import settings
 from django.urls import reverse
 from typing import List, Optional
+from datetime import timedelta
+from functools import lru_cache
+from . import slack
+from .ratelimit import RateLimited
 from .utils import send_slack, send_email
 
 CHANNEL_SLACK = "slack"
 CHANNEL_EMAIL = "email"
 STATUS_QUEUED = "queued"
+STATUS_SENDING = "sending"   # claimed by an outbox worker
 STATUS_SENT   = "sent"
 STATUS_FAILED = "failed"
 
+SLACK_MAX_BLOCKS = 50  # per message
+
+
+@lru_cache(maxsize=None)
+def _admin_change_url_parts(app: str, model: str) -> tuple:
+    """
+    ("/admin/app/model/", "/change/") for an admin change view, reversed once per process
+    so per-message links are plain string joins.
+    """
+    path = reverse(f"admin:{app}_{model}_change", args=[0])
+    prefix, _, suffix = path.rpartition("/0/")
+    return prefix + "/", "/" + suffix
+
+class NotificationLogQuerySet(models.QuerySet):
+    def create_once(self, **fields):
+        """
+        Create a row unless one with the same dedupe_key exists. Returns (log, created).
+        """
+        key = fields.get("dedupe_key")
+        if not key:
+            return self.create(**fields), True
+        try:
+            with transaction.atomic():
+                return self.create(**fields), True
+        except IntegrityError:
+            return self.get(dedupe_key=key), False
+
+    def enqueue(self, logs, batch_size: int = 1000) -> list:
+        """
+        Insert-or-skip for many rows: logs whose dedupe_key already exists are dropped,
+        and the unique index rejects any that race in from another node. Returns the logs
+        that were new at the time of the check (bulk_create skips post_save signals).
+        """
+        logs = list(logs)
+        keys = {log.dedupe_key for log in logs if log.dedupe_key}
+        existing = set(self.filter(dedupe_key__in=keys).values_list("dedupe_key", flat=True)) if keys else set()
+        fresh, seen = [], set()
+        for log in logs:
+            if log.dedupe_key:
+                if log.dedupe_key in existing or log.dedupe_key in seen:
+                    continue
+                seen.add(log.dedupe_key)
+            fresh.append(log)
+        self.bulk_create(fresh, batch_size=batch_size, ignore_conflicts=True)
+        return fresh
+
+
 class NotificationLog(models.Model):
     CHANNEL_CHOICES = [(CHANNEL_SLACK, "Slack"), (CHANNEL_EMAIL, "Email")]
-    STATUS_CHOICES  = [(STATUS_QUEUED, "Queued"), (STATUS_SENT, "Sent"), (STATUS_FAILED, "Failed")]
+    STATUS_CHOICES  = [
+        (STATUS_QUEUED, "Queued"), (STATUS_SENDING, "Sending"), (STATUS_SENT, "Sent"), (STATUS_FAILED, "Failed"),
+    ]
 
     channel = models.CharField(max_length=16, choices=CHANNEL_CHOICES)
     to = models.CharField(max_length=255, blank=True, default="")          # email or Slack label (for webhook)
@@ -27,6 +82,9 @@ class NotificationLog(models.Model):
     # Existing linkage
     work_order_id = models.IntegerField(blank=True, null=True)
 
+    # Idempotency: e.g. "reminder:<wo>:T-3:slack:<md5 of to>"; unique, so a duplicate insert is rejected
+    dedupe_key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+
     # 🔗 NEW: deep links
     checklist_run     = models.ForeignKey("checklists.ChecklistRun", null=True, blank=True, on_delete=models.SET_NULL)
     checklist_template= models.ForeignKey("checklists.ChecklistTemplate", null=True, blank=True, on_delete=models.SET_NULL)
@@ -34,9 +92,17 @@ class NotificationLog(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
     sent_at = models.DateTimeField(blank=True, null=True)
+    claimed_at = models.DateTimeField(blank=True, null=True)               # when an outbox worker picked it up
+    deliver_after = models.DateTimeField(blank=True, null=True)            # deferred by the Slack rate limiter
+
+    objects = NotificationLogQuerySet.as_manager()
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # outbox claims: oldest queued rows first
+            models.Index(fields=["status", "id"], name="notif_status_id_idx"),
+        ]
 
     def __str__(self) -> str:
         tag = f"{self.channel}:{self.to or '-'}"
@@ -54,8 +120,8 @@ class NotificationLog(models.Model):
 
     def _admin_link(self, app: str, model: str, pk: int, label: str) -> Optional[str]:
         try:
-            path = reverse(f"admin:{app}_{model}_change", args=[pk])  # e.g., admin:checklists_checklistrun_change
-            url = self._abs(path)
+            prefix, suffix = _admin_change_url_parts(app, model)  # e.g., admin:checklists_checklistrun_change
+            url = self._abs(f"{prefix}{pk}{suffix}")
             return f"<{url}|{label}>"
         except Exception:
             return None
@@ -71,12 +137,36 @@ class NotificationLog(models.Model):
             lines.append(body)
         return "\n".join(lines) or "(no content)"
 
+    def _digest_blocks(self, items: list) -> list:
+        """
+        One section per work order in a digest page (payload["digest"]), each linking
+        to the order's admin page.
+        """
+        blocks = []
+        for item in items:
+            link = self._admin_link("workorders", "workorder", item["id"], f"WO#{item['id']}") or f"WO#{item['id']}"
+            line = f"{link} — {item['robot']} at {item['site']}, due {item['due']}"
+            if item.get("assignee"):
+                line += f" · {item['assignee']}"
+            blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": line}})
+        return blocks
+
     def _as_slack_blocks(self) -> Optional[list]:
         """
         Build a Block Kit payload that includes links to checklist run/template/policy when present.
         Works for Incoming Webhooks and chat.postMessage alike.
+        Returns the blocks pre-rendered by apps.notifications.render when present.
         """
+        if "_rendered_blocks" in self.__dict__:
+            return self._rendered_blocks
         label = (self.to or "#maintenance-scheduler").strip()
+        p = self.payload if isinstance(self.payload, dict) else {}
+        if p.get("digest"):
+            title = (self.subject or "").strip()
+            blocks = [{"type": "section", "text": {"type": "mrkdwn", "text": f"*{title}*"}}] if title else []
+            blocks += self._digest_blocks(p["digest"])
+            blocks.append({"type": "context", "elements": [{"type": "mrkdwn", "text": f"Posted from Maintenance Scheduler • {label}"}]})
+            return blocks[:SLACK_MAX_BLOCKS]
         blocks = []
 
         # Title & body
@@ -111,10 +201,10 @@ class NotificationLog(models.Model):
             if link:
                 fields.append({"type": "mrkdwn", "text": f"*Policy:*\n{link}"})
 
-        # Optional: Work Order id (no FK in your model yet)
+        # Work Order link (Admin; work_order_id is a plain integer, not an FK)
         if self.work_order_id:
-            # Admin change URL if you later add FK; for now, plain text
-            fields.append({"type": "mrkdwn", "text": f"*Work Order:*\n#{self.work_order_id}"})
+            link = self._admin_link("workorders", "workorder", self.work_order_id, f"#{self.work_order_id}")
+            fields.append({"type": "mrkdwn", "text": f"*Work Order:*\n{link or f'#{self.work_order_id}'}"})
 
         if fields:
             blocks.append({"type": "section", "fields": fields})
@@ -124,39 +214,113 @@ class NotificationLog(models.Model):
 
         return blocks or None
 
+    def _slack_text(self) -> str:
+        """
+        Plain-text fallback for chat.postMessage, with any payload checklist appended.
+        """
+        text = self._as_text_for_slack()
+        p = self.payload if isinstance(self.payload, dict) else {}
+        if p.get("checklist"):
+            bulleted = "\n".join([f"• {i}" for i in p["checklist"]])
+            text += f"\n\n*Checklist:*\n{bulleted}"
+        return text
+
     # ---------- state helpers ----------
-    def _mark(self, status: str, error_msg: str = "") -> None:
+    def _set(self, status: str, error_msg: str = "") -> None:
         self.status = status
         self.error = error_msg
         if status == STATUS_SENT and not self.sent_at:
             self.sent_at = timezone.now()
+
+    def _mark(self, status: str, error_msg: str = "") -> None:
+        self._set(status, error_msg)
         self.save(update_fields=["status", "error", "sent_at"])
 
     # ---------- main API ----------
-    def send(self) -> bool:
+    def _deliver_email(self, connection=None) -> bool:
+        """
+        One message per recipient so a refused address doesn't sink the others; the row
+        is sent if any recipient accepted, and refused ones are listed in `error`.
+        """
+        recipients: List[str] = [e.strip() for e in (self.to or "").split(",") if e.strip()]
+        if not recipients:
+            self._set(STATUS_FAILED, "No email recipients")
+            return False
+        failed = []
+        for rcpt in recipients:
+            try:
+                send_email([rcpt], self.subject or "(no subject)", self.message or "", connection=connection)
+            except smtplib.SMTPServerDisconnected:
+                if connection is not None:
+                    raise  # the caller owns the connection and reconnects
+                failed.append(f"{rcpt}: server disconnected")
+            except smtplib.SMTPRecipientsRefused as e:
+                code, msg = e.recipients.get(rcpt, (None, b""))
+                failed.append(f"{rcpt}: {code} {msg.decode(errors='replace') if isinstance(msg, bytes) else msg}")
+            except Exception as e:
+                failed.append(f"{rcpt}: {e}")
+        if len(failed) == len(recipients):
+            self._set(STATUS_FAILED, "; ".join(failed))
+            return False
+        self._set(STATUS_SENT, "; ".join(failed))
+        return True
+
+    def deliver(self, connection=None) -> bool:
+        """
+        Deliver the message and set status/error/sent_at on the instance without saving,
+        so the outbox can write a whole batch back at once. Never raises.
+        A rate-limited Slack message goes back to queued with `deliver_after` set.
+        `connection` is an open mail connection to reuse for email rows; with one, a
+        dropped connection raises SMTPServerDisconnected so the caller can reconnect.
+        """
+        if self.channel == CHANNEL_EMAIL and connection is not None:
+            return self._deliver_email(connection)  # may raise SMTPServerDisconnected
         try:
             if self.channel == CHANNEL_EMAIL:
-                recipients: List[str] = [e.strip() for e in (self.to or "").split(",") if e.strip()]
-                send_email(recipients, self.subject or "(no subject)", self.message or "")
-                self._mark(STATUS_SENT)
-                return True
+                return self._deliver_email()
 
             if self.channel == CHANNEL_SLACK:
-                label = (self.to or "#maintenance-scheduler").strip()
-                text = self._as_text_for_slack()
                 blocks = self._as_slack_blocks()
-                ok = send_slack(label, text, blocks=blocks)  # 🔥 now sends Block Kit
-                if ok:
-                    self._mark(STATUS_SENT)
+                if slack.SLACK_BOT_TOKEN:
+                    # Bot token: chat.postMessage, then any files from payload["files"] in the thread.
+                    channel = (self.to or "").strip() or None
+                    resp = slack.post_message(text=self._slack_text(), channel=channel, blocks=blocks)
+                    p = self.payload if isinstance(self.payload, dict) else {}
+                    failed = []
+                    if p.get("files"):
+                        results = slack.upload_files(
+                            filepaths=p["files"], channel=channel, initial_comment="Attachments",
+                            thread_ts=resp.get("ts"),
+                        )
+                        failed = [f"{r['name']}: {r['error']}" for r in results if not r["ok"]]
+                    # The message went out; attachment failures are noted but don't fail the row.
+                    self._set(STATUS_SENT, "; ".join(failed))
+                    return True
+
+                label = (self.to or "#maintenance-scheduler").strip()
+                if send_slack(label, self._as_text_for_slack(), blocks=blocks):
+                    self._set(STATUS_SENT)
                     return True
-                else:
-                    self._mark(STATUS_FAILED, "Slack webhook failed or not configured")
-                    return False
+                self._set(STATUS_FAILED, "Slack webhook failed or not configured")
+                return False
 
-            self._mark(STATUS_FAILED, f"Unknown channel '{self.channel}'")
+            self._set(STATUS_FAILED, f"Unknown channel '{self.channel}'")
+            return False
+
+        except RateLimited as e:
+            self._set(STATUS_QUEUED, str(e))
+            self.deliver_after = timezone.now() + timedelta(seconds=e.retry_after)
             return False
 
         except Exception as e:
-            self._mark(STATUS_FAILED, str(e))
+            self._set(STATUS_FAILED, str(e))
             return False
 
+    def send(self) -> bool:
+        """
+        Deliver synchronously and save the outcome. Web code should queue rows for the
+        outbox (apps.notifications.outbox) instead of calling this.
+        """
+        ok = self.deliver()
+        self.save(update_fields=["status", "error", "sent_at", "deliver_after"])
+        return ok
@@ -0,0 +1,101 @@
+# apps/notifications/outbox.py
+"""
+Queued NotificationLog rows are an outbox.
+
+Workers claim a batch with SELECT ... FOR UPDATE SKIP LOCKED and flip it to "sending"
+(so concurrent workers never share rows), deliver the batch on a bounded thread pool
+outside any transaction (email rows over shared SMTP connections, see mailer), and
+write the outcomes back with one bulk_update.
+Rows left in "sending" by a worker that died are reclaimed after CLAIM_TIMEOUT.
+Rate-limited rows go back to "queued" with `deliver_after` and are skipped until then.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .mailer import deliver_emails
+from .models import NotificationLog, CHANNEL_EMAIL, STATUS_QUEUED, STATUS_SENDING, STATUS_SENT
+from .render import render_blocks
+
+BATCH_SIZE = getattr(settings, "NOTIFICATIONS_OUTBOX_BATCH_SIZE", 100)
+CONCURRENCY = getattr(settings, "NOTIFICATIONS_OUTBOX_CONCURRENCY", 8)
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def claim_batch(batch_size: int = BATCH_SIZE, now=None, ids=None) -> list:
+    """
+    Claim up to `batch_size` queued (or stale "sending") rows for this worker, only among
+    `ids` when given.
+    """
+    now = now or timezone.now()
+    rows = NotificationLog.objects.select_for_update(skip_locked=True)
+    if ids is not None:
+        rows = rows.filter(id__in=ids)
+    with transaction.atomic():
+        ids = list(
+            rows.filter(Q(status=STATUS_QUEUED) | Q(status=STATUS_SENDING, claimed_at__lt=now - CLAIM_TIMEOUT))
+            .filter(Q(deliver_after__isnull=True) | Q(deliver_after__lte=now))
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if ids:
+            NotificationLog.objects.filter(id__in=ids).update(status=STATUS_SENDING, claimed_at=now)
+
+    # Blocks are rendered here for the whole batch, so delivery threads never touch the DB.
+    return render_blocks(NotificationLog.objects.filter(id__in=ids).order_by("id"))
+
+
+def deliver_batch(rows: list, concurrency: int = CONCURRENCY) -> dict:
+    """
+    Deliver claimed rows concurrently and save their outcomes in bulk.
+    Returns {"sent", "failed", "deferred", "next_at"}; next_at is the earliest deferral.
+    """
+    result = {"sent": 0, "failed": 0, "deferred": 0, "next_at": None}
+    if not rows:
+        return result
+    emails = [row for row in rows if row.channel == CHANNEL_EMAIL]
+    others = [row for row in rows if row.channel != CHANNEL_EMAIL]
+    if emails:
+        deliver_emails(emails)  # shared SMTP connections per chunk
+    if others:
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(others)))) as pool:
+            list(pool.map(lambda row: row.deliver(), others))
+    NotificationLog.objects.bulk_update(rows, ["status", "error", "sent_at", "deliver_after"])
+
+    for row in rows:
+        if row.status == STATUS_SENT:
+            result["sent"] += 1
+        elif row.status == STATUS_QUEUED:
+            result["deferred"] += 1
+            if result["next_at"] is None or row.deliver_after < result["next_at"]:
+                result["next_at"] = row.deliver_after
+        else:
+            result["failed"] += 1
+    return result
+
+
+def dispatch(
+    batch_size: int = BATCH_SIZE, concurrency: int = CONCURRENCY, max_batches: int = 50, ids=None
+) -> dict:
+    """
+    Drain the outbox batch by batch until it is empty or `max_batches` is reached.
+    `ids` limits the pass to those rows. `next_at` in the summary is when the earliest
+    deferred row becomes due again.
+    """
+    summary = {"claimed": 0, "sent": 0, "failed": 0, "deferred": 0, "batches": 0, "next_at": None}
+    for _ in range(max_batches):
+        rows = claim_batch(batch_size, ids=ids)
+        if not rows:
+            break
+        result = deliver_batch(rows, concurrency)
+        summary["batches"] += 1
+        summary["claimed"] += len(rows)
+        for key in ("sent", "failed", "deferred"):
+            summary[key] += result[key]
+        if result["next_at"] and (summary["next_at"] is None or result["next_at"] < summary["next_at"]):
+            summary["next_at"] = result["next_at"]
+    return summary
@@ -0,0 +1,148 @@
+# apps/notifications/ratelimit.py
+"""
+Token buckets for outbound Slack traffic, shared across workers: one per channel for
+chat.postMessage, one per webhook URL for Incoming Webhooks (which always post to the
+same channel whatever label the message carries).
+
+Buckets live in Redis (one Lua call per acquire, using the Redis clock so workers agree)
+when REDIS_URL is set, and in process memory otherwise or while Redis is unreachable.
+A 429's Retry-After blocks the bucket for that long. Callers get a
+RateLimited exception with the wait instead of a failure, and the outbox re-queues
+the message for later.
+"""
+import logging
+import threading
+import time
+from typing import Optional
+
+import redis
+from django.conf import settings
+
+log = logging.getLogger(__name__)
+
+# Slack allows roughly one message per second per channel, with short bursts.
+SLACK_RATE = getattr(settings, "NOTIFICATIONS_SLACK_RATE", 1.0)    # tokens per second
+SLACK_BURST = getattr(settings, "NOTIFICATIONS_SLACK_BURST", 4)    # bucket size
+KEY_PREFIX = "notifications:ratelimit:"
+REDIS_RETRY_INTERVAL = 30.0  # after a Redis error, use memory for this long
+
+
+class RateLimited(Exception):
+    """
+    Raised instead of sending when a channel is out of tokens or blocked by a 429.
+    """
+
+    def __init__(self, key: str, retry_after: float):
+        super().__init__(f"rate limited on {key}; retry in {retry_after:.1f}s")
+        self.key = key
+        self.retry_after = retry_after
+
+
+_ACQUIRE = """
+local ttl = redis.call('PTTL', KEYS[2])
+if ttl > 0 then return tostring(ttl / 1000) end
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(b[1]) or burst
+local ts = tonumber(b[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 60)
+return tostring(wait)
+"""
+
+
+class _MemoryBuckets:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = {}   # key -> (tokens, ts)
+        self.blocked = {}   # key -> monotonic deadline
+
+    def acquire(self, key: str, rate: float, burst: float) -> float:
+        now = time.monotonic()
+        with self.lock:
+            until = self.blocked.get(key, 0.0)
+            if until > now:
+                return until - now
+            tokens, ts = self.buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + max(0.0, now - ts) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self.buckets[key] = (tokens, now)
+            return wait
+
+    def block(self, key: str, seconds: float) -> None:
+        with self.lock:
+            self.blocked[key] = max(self.blocked.get(key, 0.0), time.monotonic() + seconds)
+
+
+class RateLimiter:
+    def __init__(self, redis_url: Optional[str] = None):
+        self.redis_url = redis_url
+        self.memory = _MemoryBuckets()
+        self._redis = None
+        self._script = None
+        self._redis_down_until = 0.0
+
+    def _client(self):
+        if not self.redis_url or time.monotonic() < self._redis_down_until:
+            return None
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(self.redis_url, socket_timeout=1, socket_connect_timeout=1)
+            self._script = self._redis.register_script(_ACQUIRE)
+        return self._redis
+
+    def _redis_failed(self, exc) -> None:
+        log.warning("Rate limiter falling back to memory: %s", exc)
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_INTERVAL
+
+    def acquire(self, key: str, rate: float = SLACK_RATE, burst: float = SLACK_BURST) -> float:
+        """
+        Take one token for `key`. Returns 0 when granted, else seconds until one is due.
+        """
+        client = self._client()
+        if client is not None:
+            try:
+                return float(self._script(keys=[KEY_PREFIX + key, KEY_PREFIX + key + ":blocked"], args=[rate, burst]))
+            except redis.RedisError as exc:
+                self._redis_failed(exc)
+        return self.memory.acquire(key, rate, burst)
+
+    def block(self, key: str, seconds: float) -> None:
+        """
+        Hold `key` for `seconds` (a 429's Retry-After) on every worker.
+        """
+        seconds = max(0.0, float(seconds))
+        self.memory.block(key, seconds)
+        client = self._client()
+        if client is not None and seconds:
+            try:
+                client.set(KEY_PREFIX + key + ":blocked", 1, px=int(seconds * 1000))
+            except redis.RedisError as exc:
+                self._redis_failed(exc)
+
+    def check(self, key: str, rate: float = SLACK_RATE, burst: float = SLACK_BURST) -> None:
+        """
+        acquire() that raises RateLimited instead of returning a wait.
+        """
+        wait = self.acquire(key, rate, burst)
+        if wait > 0:
+            raise RateLimited(key, wait)
+
+
+def retry_after(headers, default: float = 1.0) -> float:
+    try:
+        return max(0.0, float(headers.get("Retry-After")))
+    except (TypeError, ValueError):
+        return default
+
+
+limiter = RateLimiter(getattr(settings, "REDIS_URL", ""))
@@ -0,0 +1,32 @@
+# apps/notifications/render.py
+"""
+Batch Block Kit rendering for NotificationLogs.
+
+The per-row formatter reads checklist_template and maintenance_policy for link labels,
+which is a lazy query per row unless the relations are loaded. render_blocks loads
+them for a whole batch in one query each and renders every row once; admin URL
+prefixes are resolved once per process (see models._admin_change_url_parts).
+"""
+from django.db.models import QuerySet, prefetch_related_objects
+
+
+# Relations the Slack formatter dereferences (checklist_run is only used by id).
+RELATED = ("checklist_template", "maintenance_policy")
+
+
+def render_blocks(logs) -> list:
+    """
+    Render Slack blocks for a queryset or list of NotificationLogs. The blocks are kept on
+    each instance, so a later deliver() reuses them. Returns the list of logs.
+    """
+    if isinstance(logs, QuerySet):
+        logs = list(logs.select_related(*RELATED))
+    else:
+        logs = list(logs)
+        prefetch_related_objects(logs, *RELATED)  # skips relations already loaded
+
+    for log in logs:
+        log.__dict__.pop("_rendered_blocks", None)
+        log._rendered_blocks = log._as_slack_blocks()
+    return logs
+
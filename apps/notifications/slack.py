@@ -1,10 +1,18 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Iterable
+from django.conf import settings
+from django.core.files.storage import Storage, default_storage
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 
+from .ratelimit import RateLimited, limiter, retry_after
+from .utils import get_session
+
 SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN", "")
 SLACK_DEFAULT_CHANNEL = os.getenv("SLACK_DEFAULT_CHANNEL", "")
+UPLOAD_CONCURRENCY = getattr(settings, "NOTIFICATIONS_UPLOAD_CONCURRENCY", 4)
+UPLOAD_TIMEOUT = (5, 120)  # connect, read; photos can be large
 
 _client = WebClient(token=SLACK_BOT_TOKEN)
 
@@ -17,6 +25,7 @@ def post_message(
     """
     Post a message to Slack. `channel` should be a channel ID (C… or G…).
     Returns Slack response (contains 'ts' for threading).
+    Raises RateLimited when the channel is out of tokens or Slack answers 429.
     """
     if not SLACK_BOT_TOKEN:
         raise RuntimeError("SLACK_BOT_TOKEN not set")
@@ -24,21 +33,69 @@ def post_message(
     if not channel:
         raise RuntimeError("No Slack channel provided and SLACK_DEFAULT_CHANNEL not set")
 
+    key = f"slack:{channel}"
+    limiter.check(key)
     try:
         resp = _client.chat_postMessage(channel=channel, text=text or " ", blocks=blocks, thread_ts=thread_ts)
         return resp.data
     except SlackApiError as e:
+        if e.response.status_code == 429:
+            wait = retry_after(e.response.headers)
+            limiter.block(key, wait)
+            raise RateLimited(key, wait)
         raise RuntimeError(f"Slack chat_postMessage failed: {e.response.get('error')}")
     
 
+def _open(name: str, storage: Storage):
+    """
+    Open a file for streaming: an absolute path on local disk, otherwise a name in `storage`.
+    Returns (file object, size in bytes).
+    """
+    if os.path.isabs(name) and os.path.exists(name):
+        fh = open(name, "rb")
+        return fh, os.fstat(fh.fileno()).st_size
+    fh = storage.open(name, "rb")
+    return fh, fh.size
+
+
+def _upload_one(name: str, storage: Storage) -> dict:
+    """
+    Stream one file to a Slack upload URL (files.getUploadURLExternal + POST).
+    The share happens later in one files.completeUploadExternal call.
+    """
+    filename = os.path.basename(name)
+    try:
+        fh, size = _open(name, storage)
+        with fh:
+            ticket = _client.files_getUploadURLExternal(filename=filename, length=size)
+            resp = get_session().post(
+                ticket["upload_url"], data=fh, headers={"Content-Length": str(size)}, timeout=UPLOAD_TIMEOUT
+            )
+        if not resp.ok:
+            return {"name": name, "ok": False, "error": f"upload returned HTTP {resp.status_code}"}
+        return {"name": name, "ok": True, "file_id": ticket["file_id"], "title": filename}
+    except SlackApiError as e:
+        return {"name": name, "ok": False, "error": f"files.getUploadURLExternal failed: {e.response.get('error')}"}
+    except Exception as e:
+        return {"name": name, "ok": False, "error": str(e)}
+
+
 def upload_files(
     filepaths: Iterable[str],
     channel: Optional[str] = None,
     initial_comment: str = "",
     thread_ts: Optional[str] = None,
+    storage: Optional[Storage] = None,
+    concurrency: int = UPLOAD_CONCURRENCY,
 ) -> list[dict]:
     """
-    Upload one or more files to Slack. `filepaths` are absolute paths on disk.
+    Upload one or more files to Slack and share them in one message.
+
+    `filepaths` are names in `storage` (default_storage by default, e.g. ChecklistRun photos
+    or ticket attachments) or absolute paths on disk. Files are streamed to Slack in
+    parallel on a bounded pool, so a set takes about as long as its slowest file.
+    Returns one {"name", "ok", "file_id" | "error"} dict per file, in order; a failed
+    file does not stop the others.
     """
     if not SLACK_BOT_TOKEN:
         raise RuntimeError("SLACK_BOT_TOKEN not set")
@@ -46,16 +103,24 @@ def upload_files(
     if not channel:
         raise RuntimeError("No Slack channel provided and SLACK_DEFAULT_CHANNEL not set")
 
-    results = []
-    for fp in filepaths:
+    filepaths = list(filepaths)
+    if not filepaths:
+        return []
+    storage = storage or default_storage
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(filepaths)))) as pool:
+        results = list(pool.map(lambda name: _upload_one(name, storage), filepaths))
+
+    uploaded = [r for r in results if r["ok"]]
+    if uploaded:
         try:
-            resp = _client.files_upload_v2(
-                channel=channel,
-                initial_comment=initial_comment,
-                file=fp,
+            _client.files_completeUploadExternal(
+                files=[{"id": r["file_id"], "title": r["title"]} for r in uploaded],
+                channel_id=channel,
+                initial_comment=initial_comment or None,
                 thread_ts=thread_ts,
             )
-            results.append(resp.data)
         except SlackApiError as e:
-            raise RuntimeError(f"Slack files_upload_v2 failed for {fp}: {e.response.get('error')}")
+            error = f"files.completeUploadExternal failed: {e.response.get('error')}"
+            for r in uploaded:
+                r.update(ok=False, error=error)
     return results
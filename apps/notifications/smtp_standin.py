@@ -0,0 +1,100 @@
+# apps/notifications/smtp_standin.py
+"""
+Minimal in-process SMTP server for local tests and benchmarks (no TLS, no auth).
+
+Accepts everything except recipients containing REJECT_MARKER, which get a 550, and
+counts connections and messages so callers can check connection reuse. With `drop_after`
+set, each connection is closed without a goodbye after that many messages, the way a
+server enforcing a per-connection limit would.
+"""
+import socketserver
+import threading
+import time
+
+REJECT_MARKER = "reject"
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    disable_nagle_algorithm = True
+
+    def _reply(self, line: str) -> None:
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self._reply("220 localhost stand-in ESMTP")
+        recipients = []
+        accepted = 0
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            command = raw.decode("utf-8", "replace").strip()
+            verb = command[:4].upper()
+            if verb == "EHLO":
+                self._reply("250-localhost")
+                self._reply("250 8BITMIME")
+            elif verb == "HELO":
+                self._reply("250 localhost")
+            elif verb == "MAIL":
+                recipients = []
+                self._reply("250 OK")
+            elif verb == "RCPT":
+                if REJECT_MARKER in command.lower():
+                    self._reply("550 No such user")
+                else:
+                    recipients.append(command)
+                    self._reply("250 OK")
+            elif verb == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                if server.latency:
+                    time.sleep(server.latency)
+                with server.lock:
+                    server.messages += 1
+                self._reply("250 OK queued")
+                accepted += 1
+                if server.drop_after and accepted >= server.drop_after:
+                    return
+            elif verb == "RSET":
+                recipients = []
+                self._reply("250 OK")
+            elif verb == "NOOP":
+                self._reply("250 OK")
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class StandinSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    `with StandinSMTPServer() as smtp:` starts serving on 127.0.0.1:<smtp.port>.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port: int = 0, latency: float = 0.0, drop_after: int = 0):
+        super().__init__(("127.0.0.1", port), _SMTPHandler)
+        self.latency = latency
+        self.drop_after = drop_after
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
@@ -1,28 +1,274 @@
+import hashlib
+import logging
+from collections import defaultdict
+
 from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
+from apps.fleet.models import Site
+from maint_app.celery import publish
+from maint_app.versioning import fingerprint
 from apps.workorders.models import WorkOrder
-from .utils import send_slack, send_email
+from . import outbox
+from .models import NotificationLog, CHANNEL_SLACK, CHANNEL_EMAIL, SLACK_MAX_BLOCKS
+
+REMINDER_DAYS = (14, 3, 0)  # T-14, T-3 and day-of, all at REMINDER_HOUR site-local time
+REMINDER_HOUR = getattr(settings, "NOTIFICATIONS_REMINDER_HOUR", 9)
+# A site is picked up while its local hour is in [REMINDER_HOUR, REMINDER_HOUR + window),
+# so one late or skipped hourly run doesn't drop a day; the sent markers prevent repeats.
+REMINDER_WINDOW_HOURS = getattr(settings, "NOTIFICATIONS_REMINDER_WINDOW_HOURS", 2)
+
+# One Slack message per channel per bucket instead of one per order.
+REMINDER_DIGEST = getattr(settings, "NOTIFICATIONS_REMINDER_DIGEST", True)
+DIGEST_PAGE_SIZE = SLACK_MAX_BLOCKS - 2  # leaves room for the title and context blocks
+
+log = logging.getLogger(__name__)
+
+_site_zones = None
+_site_zones_version = None
+
+
+def _zone(name: str):
+    try:
+        return ZoneInfo(name or "UTC")
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo("UTC")
+
+
+def _sites_by_zone() -> dict:
+    """
+    {tz name: [site ids]}, reloaded only when a Site is added, removed or edited.
+    """
+    global _site_zones, _site_zones_version
+    version = fingerprint(Site.objects.all())
+    if _site_zones is None or version != _site_zones_version:
+        zones = defaultdict(list)
+        for site_id, tz in Site.objects.values_list("id", "tz"):
+            zones[tz or "UTC"].append(site_id)
+        _site_zones, _site_zones_version = dict(zones), version
+    return _site_zones
+
+
+def sites_by_offset(now=None) -> dict:
+    """
+    {UTC offset: {tz name: [site ids]}} as of `now`; DST makes the grouping move, the
+    zone lists don't.
+    """
+    now = now or timezone.now()
+    groups = defaultdict(dict)
+    for name, site_ids in _sites_by_zone().items():
+        groups[now.astimezone(_zone(name)).utcoffset()][name] = site_ids
+    return groups
+
+
+def due_zones(now=None, hour: int = REMINDER_HOUR) -> dict:
+    """
+    {tz name: [site ids]} for the offset groups whose local clock is inside the reminder
+    window right now; usually a few zones out of the whole fleet.
+    """
+    now = now or timezone.now()
+    due = {}
+    for offset, zones in sites_by_offset(now).items():
+        local_hour = (now + offset).astimezone(dt_timezone.utc).hour
+        if hour <= local_hour < hour + REMINDER_WINDOW_HOURS:
+            due.update(zones)
+    return due
+
+
+def _local_day_range(day, zone):
+    return (
+        datetime.combine(day, time.min, tzinfo=zone),
+        datetime.combine(day + timedelta(days=1), time.min, tzinfo=zone),
+    )
+
+
+def reminder_buckets(now=None) -> list:
+    """
+    [(days_before_due, queryset), ...] for the sites whose local reminder hour is now.
+    Each queryset covers orders due on that local day at those sites (one (status, due_by)
+    range per zone) that have not yet had this reminder or a later one.
+    """
+    now = now or timezone.now()
+    zones = due_zones(now)
+    if not zones:
+        return []
+
+    buckets = []
+    for n in REMINDER_DAYS:
+        window = Q()
+        for name, site_ids in zones.items():
+            zone = _zone(name)
+            start, end = _local_day_range(now.astimezone(zone).date() + timedelta(days=n), zone)
+            window |= Q(site_id__in=site_ids, due_by__gte=start, due_by__lt=end)
+        qs = (
+            WorkOrder.objects.filter(window, status__in=WorkOrder.NOT_STARTED_STATUSES)
+            .filter(Q(last_reminder_days__isnull=True) | Q(last_reminder_days__gt=n))
+            .select_related("robot", "site", "assigned_to")
+            .order_by("due_by", "id")
+        )
+        buckets.append((n, qs))
+    return buckets
+
 
-REMINDER_DAYS = (14, 3)  # T-14 and T-3; add day-of in code
+@shared_task
+def dispatch_outbox(batch_size: int = outbox.BATCH_SIZE, concurrency: int = outbox.CONCURRENCY):
+    """
+    Drain queued NotificationLogs; several workers can run this at once.
+    """
+    summary = outbox.dispatch(batch_size, concurrency)
+    if summary["batches"] and summary["claimed"] == summary["batches"] * batch_size:
+        # Stopped at max_batches with a full last batch; there may be more.
+        dispatch_outbox.delay(batch_size, concurrency)
+    elif summary["next_at"]:
+        # Rate-limited rows: come back when the first of them is due.
+        countdown = max(1.0, (summary["next_at"] - timezone.now()).total_seconds())
+        dispatch_outbox.apply_async((batch_size, concurrency), countdown=countdown)
+    summary["next_at"] = summary["next_at"].isoformat() if summary["next_at"] else None
+    return summary
+
+
+def queue_dispatch(ids=None) -> None:
+    """
+    Kick an outbox worker once the current transaction commits. Without a broker (or if
+    the publish fails) the rows are delivered in-process instead: only `ids`, the rows
+    this transaction queued, so a web request never drains the whole outbox.
+    """
+    ids = list(ids) if ids is not None else None
+    transaction.on_commit(lambda: publish(dispatch_outbox, fallback=lambda: _dispatch_inline(ids)))
+
+
+def _dispatch_inline(ids=None) -> None:
+    """
+    One synchronous outbox pass over `ids` (None: everything queued). Rate-limited rows
+    stay queued for the next pass.
+    """
+    if ids is not None and not ids:
+        return
+    try:
+        outbox.dispatch(ids=ids)
+    except Exception:
+        log.exception("in-process outbox dispatch failed; rows stay queued")
 
 
 @shared_task
 def send_due_reminders():
     """
-    Send reminders for planned/assigned WorkOrders at T-14, T-3, and T-0 09:00.
+    Queue reminders for planned/assigned WorkOrders at T-14, T-3, and T-0, at 09:00 in
+    each site's own time zone (run hourly; each run covers the zones at that hour).
+    In digest mode each Slack channel gets one message per bucket (paged to fit Slack's
+    block limit) instead of one per order; assignee emails stay per order.
+    Safe to run hourly: each order records the last bucket it was reminded for.
+    Parallel runs split the orders between them: each run claims orders before building
+    messages, so a digest page only ever lists orders its own run claimed.
     """
-    now = timezone.now()
-    for wo in WorkOrder.objects.filter(status__in=["planned", "assigned"]).select_related("site", "assigned_to"):
-        days_to_due = (wo.due_by.date() - now.date()).days
+    sent = 0
+    for days, orders in reminder_buckets():
+        with transaction.atomic():
+            reminded = _claim_reminders(orders, days)
+            if not reminded:
+                continue
+            logs = []
+            by_channel = defaultdict(list)
+            for wo in reminded:
+                by_channel[wo.site.slack_channel or "#ops"].append(wo)
+                if days and wo.assigned_to and wo.assigned_to.email:
+                    logs.append(_reminder(wo, days, CHANNEL_EMAIL, wo.assigned_to.email, "Maintenance Reminder"))
+
+            for channel, channel_orders in by_channel.items():
+                if REMINDER_DIGEST and len(channel_orders) > 1:
+                    logs.extend(_digest(channel, channel_orders, days))
+                else:
+                    logs.extend(_reminder(wo, days, CHANNEL_SLACK, channel) for wo in channel_orders)
+
+            # Keys already queued (e.g. by a run that died before committing its claim) are skipped.
+            fresh = NotificationLog.objects.enqueue(logs)
+            queue_dispatch(
+                NotificationLog.objects.filter(dedupe_key__in=[row.dedupe_key for row in fresh])
+                .values_list("id", flat=True)
+            )
+        sent += len(reminded)
+    return sent
+
+
+def _claim_reminders(orders, days: int) -> list:
+    """
+    Flip last_reminder_days to `days` on the orders of a bucket that still need it and
+    return those orders. Rows another run has locked are skipped, and the UPDATE repeats
+    the bucket condition, so each order is claimed by exactly one run. Call inside atomic().
+    """
+    ids = list(orders.select_for_update(skip_locked=True, of=("self",)).values_list("id", flat=True))
+    if not ids:
+        return []
+    due = Q(last_reminder_days__isnull=True) | Q(last_reminder_days__gt=days)
+    WorkOrder.objects.filter(due, id__in=ids).update(last_reminder_days=days)
+    return list(
+        WorkOrder.objects.filter(id__in=ids, last_reminder_days=days)
+        .select_related("robot", "site", "assigned_to")
+        .order_by("due_by", "id")
+    )
+
+
+def _reminder_text(wo, days: int) -> str:
+    if days:
+        return f"Reminder: WO#{wo.id} for {wo.robot} at {wo.site} due {wo.due_by:%Y-%m-%d}."
+    return f"Today due: WO#{wo.id} — {wo.robot} at {wo.site}"
+
+
+def _reminder(wo, days: int, channel: str, to: str, subject: str = "") -> NotificationLog:
+    return NotificationLog(
+        channel=channel,
+        to=to,
+        subject=subject,
+        message=_reminder_text(wo, days),
+        work_order_id=wo.id,
+        maintenance_policy_id=wo.policy_id,
+        dedupe_key=f"reminder:{wo.id}:T-{days}:{channel}:{_key_digest(to)}",
+    )
+
+
+def _digest(channel: str, orders: list, days: int) -> list:
+    """
+    One Slack NotificationLog per page of DIGEST_PAGE_SIZE orders for `channel`.
+    """
+    when = f"due in {days} days" if days else "due today"
+    pages = [orders[i:i + DIGEST_PAGE_SIZE] for i in range(0, len(orders), DIGEST_PAGE_SIZE)]
+    logs = []
+    for n, page in enumerate(pages, 1):
+        subject = f"{len(orders)} work orders {when}"
+        if len(pages) > 1:
+            subject += f" ({n}/{len(pages)})"
+        items = [
+            {
+                "id": wo.id,
+                "robot": str(wo.robot),
+                "site": str(wo.site),
+                "due": f"{wo.due_by:%Y-%m-%d}",
+                "assignee": wo.assigned_to.get_username() if wo.assigned_to else "",
+            }
+            for wo in page
+        ]
+        logs.append(
+            NotificationLog(
+                channel=CHANNEL_SLACK,
+                to=channel,
+                subject=subject,
+                message="\n".join(_reminder_text(wo, days) for wo in page),
+                payload={"digest": items, "days": days},
+                dedupe_key=f"reminder-digest:T-{days}:{_key_digest(channel)}:{_ids_digest(page)}",
+            )
+        )
+    return logs
+
+
+def _key_digest(value: str) -> str:
+    # Recipients (254-char emails) and channel labels would overflow dedupe_key's 200 chars.
+    return hashlib.md5(value.encode()).hexdigest()
 
-        if days_to_due in REMINDER_DAYS:
-            msg = f"Reminder: WO#{wo.id} for {wo.robot} at {wo.site} due {wo.due_by:%Y-%m-%d}."
-            send_slack(wo.site.slack_channel or "#ops", msg)
-            if wo.assigned_to and wo.assigned_to.email:
-                send_email([wo.assigned_to.email], "Maintenance Reminder", msg)
 
-        if days_to_due == 0 and now.hour == 9:
-            msg = f"Today due: WO#{wo.id} — {wo.robot} at {wo.site}"
-            send_slack(wo.site.slack_channel or "#ops", msg)
+def _ids_digest(orders: list) -> str:
+    return hashlib.md5(",".join(str(wo.id) for wo in sorted(orders, key=lambda o: o.id)).encode()).hexdigest()
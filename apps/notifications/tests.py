@@ -0,0 +1,47 @@
+from django.test import SimpleTestCase
+
+from .mailer import deliver_emails
+from .models import NotificationLog, CHANNEL_EMAIL, STATUS_FAILED, STATUS_SENT
+from .smtp_standin import StandinSMTPServer
+
+
+def _emails(*recipients) -> list:
+    return [NotificationLog(channel=CHANNEL_EMAIL, to=to, subject="PM due", message="body") for to in recipients]
+
+
+class DeliverEmailsTests(SimpleTestCase):
+    def deliver(self, smtp, logs, **kwargs):
+        return deliver_emails(
+            logs,
+            backend="django.core.mail.backends.smtp.EmailBackend",
+            host="127.0.0.1",
+            port=smtp.port,
+            username="",
+            password="",
+            use_tls=False,
+            **kwargs,
+        )
+
+    def test_refused_recipient_does_not_sink_the_row(self):
+        with StandinSMTPServer() as smtp:
+            mixed, refused = self.deliver(smtp, _emails("ops@example.com, reject@example.com", "reject@example.com"))
+        self.assertEqual(mixed.status, STATUS_SENT)
+        self.assertIn("reject@example.com: 550", mixed.error)
+        self.assertEqual(refused.status, STATUS_FAILED)
+        self.assertEqual(smtp.messages, 1)
+
+    def test_reconnects_after_dropped_connection(self):
+        logs = _emails(*(f"tech{i}@example.com" for i in range(5)))
+        with StandinSMTPServer(drop_after=2) as smtp:
+            self.deliver(smtp, logs, batch_size=50)
+        self.assertEqual([log.status for log in logs], [STATUS_SENT] * 5)
+        self.assertEqual(smtp.messages, 5)
+        self.assertEqual(smtp.connections, 3)
+
+    def test_one_connection_per_chunk(self):
+        logs = _emails(*(f"tech{i}@example.com" for i in range(10)))
+        with StandinSMTPServer() as smtp:
+            self.deliver(smtp, logs, batch_size=5, concurrency=2)
+        self.assertEqual([log.status for log in logs], [STATUS_SENT] * 10)
+        self.assertEqual(smtp.messages, 10)
+        self.assertEqual(smtp.connections, 2)
@@ -1,25 +1,123 @@
+import hashlib
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional
+
 import requests
-from typing import List, Optional
+from django.conf import settings
+from django.core.mail import EmailMessage
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .ratelimit import RateLimited, limiter, retry_after
 
 SLACK_WEBHOOK = os.getenv("SLACK_WEBHOOK")
 
-def send_slack(channel_label: str, text: str) -> bool:
+# Connections kept alive per host; should be >= the outbox concurrency.
+HTTP_POOL_SIZE = getattr(settings, "NOTIFICATIONS_HTTP_POOL_SIZE", 16)
+HTTP_TIMEOUT = (5, 10)  # connect, read
+BATCH_MAX_WAIT = 60.0
+
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Per-process pooled session with keep-alive and bounded retries.
+
+    5xx responses are retried up to 3 times with exponential backoff; POST is included
+    since Slack webhooks are safe to repeat on those codes. 429s are not retried here:
+    send_slack hands them to the webhook's rate limiter bucket instead.
+    The session is rebuilt after a fork so workers never share sockets with their parent.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                retry = Retry(
+                    total=3,
+                    backoff_factor=0.5,
+                    status_forcelist=(500, 502, 503, 504),
+                    allowed_methods=frozenset({"POST"}),
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session, _session_pid = session, pid
+    return _session
+
+
+def _webhook_body(channel_label: str, text: str, blocks: Optional[list] = None) -> dict:
+    body = {"text": f"[{channel_label}] {text}"}
+    if blocks:
+        body["blocks"] = blocks
+    return body
+
+
+def _webhook_key(url: str) -> str:
+    return f"slack:webhook:{hashlib.sha1(url.encode()).hexdigest()[:16]}"
+
+
+def send_slack(channel_label: str, text: str, blocks: Optional[list] = None) -> bool:
     """
     Send a message to Slack via Incoming Webhook.
     `channel_label` is just a label prefix (e.g., '#ops') for clarity in the message.
-    Returns True/False for success.
+    `blocks` is an optional Block Kit payload; `text` stays as the notification fallback.
+    Returns True/False for success; raises RateLimited when the webhook has to wait.
+    Every label posts to the same webhook (one Slack channel), so they share one bucket.
     """
     if not SLACK_WEBHOOK:
         return False
-    resp = requests.post(
-        SLACK_WEBHOOK,
-        json={"text": f"[{channel_label}] {text}"},
-        timeout=10,
-    )
+    key = _webhook_key(SLACK_WEBHOOK)
+    limiter.check(key)
+    resp = get_session().post(SLACK_WEBHOOK, json=_webhook_body(channel_label, text, blocks), timeout=HTTP_TIMEOUT)
+    if resp.status_code == 429:
+        wait = retry_after(resp.headers)
+        limiter.block(key, wait)
+        raise RateLimited(key, wait)
     return resp.ok
 
-def send_email(recipients: List[str], subject: str, body: str):
-    # stub: integrate SES/SendGrid; for dev just print
-    print("EMAIL:", recipients, subject, body)
 
+def send_slack_batch(messages: Iterable[tuple], concurrency: Optional[int] = None) -> List[bool]:
+    """
+    Send many webhook messages over the pooled connections.
+    `messages` holds (channel_label, text) or (channel_label, text, blocks) tuples;
+    returns one True/False per message, in order. Errors count as False.
+    Rate-limited messages wait for the webhook (up to BATCH_MAX_WAIT seconds each).
+    """
+    messages = list(messages)
+    if not SLACK_WEBHOOK or not messages:
+        return [False] * len(messages)
+
+    def post(message) -> bool:
+        waited = 0.0
+        while True:
+            try:
+                return send_slack(*message)
+            except RateLimited as exc:
+                if waited + exc.retry_after > BATCH_MAX_WAIT:
+                    return False
+                time.sleep(exc.retry_after)
+                waited += exc.retry_after
+            except requests.RequestException:
+                return False
+
+    workers = max(1, min(concurrency or HTTP_POOL_SIZE, HTTP_POOL_SIZE, len(messages)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(post, messages))
+
+
+def send_email(recipients: List[str], subject: str, body: str, connection=None) -> int:
+    """
+    Send one plain-text email through Django's EMAIL_BACKEND (console output in dev).
+    Pass an open `connection` to reuse it across messages; raises on SMTP errors.
+    """
+    message = EmailMessage(subject, body, to=recipients, connection=connection)
+    return message.send()
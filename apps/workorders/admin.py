@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import WorkOrder
+from .models import Visit, WorkOrder
 
 
 @admin.register(WorkOrder)
@@ -18,6 +18,7 @@ class WorkOrderAdmin(admin.ModelAdmin):
         "status",
         "assigned_to",
         "completed_at",
+        "visit",
     )
 
     list_filter = (
@@ -37,3 +38,15 @@ class WorkOrderAdmin(admin.ModelAdmin):
 
     ordering = ("-due_by",)
     date_hierarchy = "due_by"
+
+
+@admin.register(Visit)
+class VisitAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for consolidated Visits.
+    """
+
+    list_display = ("id", "site", "robot", "due_by", "window_start", "window_end")
+    list_filter = ("site",)
+    ordering = ("due_by",)
+    date_hierarchy = "due_by"
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+class WorkordersConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "apps.workorders"
+    verbose_name = "Work Orders"
+
+    def ready(self):
+        from . import signals  # noqa: F401
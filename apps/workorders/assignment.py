@@ -0,0 +1,149 @@
+"""
+Batch technician assignment for planned work orders.
+
+Orders are taken earliest-due first and each goes to the least-loaded technician,
+preferring technicians who already work the order's site (from assignment/completion
+history) as long as they are within AFFINITY_SLACK orders of the least-loaded overall.
+Loads live in lazy-deletion heaps, so each pick is O(log n).
+"""
+import heapq
+from collections import defaultdict
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import WorkOrder
+
+User = get_user_model()
+
+TECHNICIAN_GROUP = "Technician"  # created by `manage.py seed_roles`
+AFFINITY_SLACK = 2
+
+
+class _LoadHeap:
+    """
+    Min-heap of (load, tech_id) with lazy invalidation against a shared loads dict.
+    """
+
+    def __init__(self, loads: dict, tech_ids):
+        self.loads = loads
+        self.heap = [(loads[t], t) for t in tech_ids]
+        heapq.heapify(self.heap)
+
+    def peek(self):
+        heap = self.heap
+        while heap and heap[0][0] != self.loads[heap[0][1]]:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def push(self, tech_id):
+        heapq.heappush(self.heap, (self.loads[tech_id], tech_id))
+
+
+def plan_assignments(horizon_days: int = 14, now=None) -> list:
+    """
+    Work out assignments for unassigned planned orders due within the horizon.
+    Returns [(work_order, technician), ...]; nothing is written.
+    """
+    now = now or timezone.now()
+    techs = {u.id: u for u in User.objects.filter(groups__name=TECHNICIAN_GROUP, is_active=True)}
+    if not techs:
+        return []
+
+    orders = list(
+        WorkOrder.objects.filter(
+            status="planned", assigned_to__isnull=True, due_by__lte=now + timedelta(days=horizon_days)
+        ).order_by("due_by", "priority", "id")
+    )
+    if not orders:
+        return []
+
+    # Current load: open work already on each technician's plate within the horizon.
+    loads = dict.fromkeys(techs, 0)
+    for row in (
+        WorkOrder.objects.filter(
+            assigned_to_id__in=techs,
+            status__in=WorkOrder.OPEN_STATUSES,
+            due_by__lte=now + timedelta(days=horizon_days),
+        )
+        .values("assigned_to_id")
+        .annotate(n=Count("id"))
+    ):
+        loads[row["assigned_to_id"]] = row["n"]
+
+    # Site affinity: any site a technician has been assigned to or completed work at.
+    affinity = defaultdict(set)  # site_id -> tech ids
+    for tech_field in ("assigned_to_id", "completed_by_id"):
+        for site_id, tech_id in (
+            WorkOrder.objects.filter(**{f"{tech_field}__in": techs})
+            .values_list("site_id", tech_field)
+            .distinct()
+        ):
+            affinity[site_id].add(tech_id)
+    tech_sites = defaultdict(list)
+    for site_id, tech_ids in affinity.items():
+        for tech_id in tech_ids:
+            tech_sites[tech_id].append(site_id)
+
+    overall = _LoadHeap(loads, techs)
+    by_site = {}
+
+    plan = []
+    for wo in orders:
+        best = overall.peek()
+        site_heap = by_site.get(wo.site_id)
+        if site_heap is None and wo.site_id in affinity:
+            site_heap = by_site[wo.site_id] = _LoadHeap(loads, affinity[wo.site_id])
+        local = site_heap.peek() if site_heap else None
+
+        choice = local if local is not None and local[0] <= best[0] + AFFINITY_SLACK else best
+        tech_id = choice[1]
+        loads[tech_id] += 1
+        overall.push(tech_id)
+        for site_id in tech_sites[tech_id]:
+            if site_id in by_site:
+                by_site[site_id].push(tech_id)
+        plan.append((wo, techs[tech_id]))
+    return plan
+
+
+def assign_work_orders(horizon_days: int = 14, dry_run: bool = False, now=None) -> dict:
+    """
+    Plan and (unless dry_run) apply assignments. Returns the diff and per-technician loads.
+    """
+    plan = plan_assignments(horizon_days, now=now)
+    diff = [
+        {
+            "work_order": wo.id,
+            "site": wo.site_id,
+            "due_by": wo.due_by.isoformat(),
+            "from": None,
+            "to": tech.get_username(),
+        }
+        for wo, tech in plan
+    ]
+    per_tech = defaultdict(list)
+    names = {}
+    for wo, tech in plan:
+        per_tech[tech.id].append(wo.id)
+        names[tech.id] = tech.get_username()
+
+    applied = 0
+    if not dry_run and plan:
+        with transaction.atomic():
+            for tech_id, ids in per_tech.items():
+                # Guarded so orders assigned by hand in the meantime are left alone.
+                applied += WorkOrder.objects.filter(
+                    id__in=ids, status="planned", assigned_to__isnull=True
+                ).update(assigned_to_id=tech_id, status="assigned", updated_at=timezone.now())
+
+    return {
+        "dry_run": dry_run,
+        "planned": len(plan),
+        "applied": applied,
+        "by_technician": {names[tech_id]: len(ids) for tech_id, ids in per_tech.items()},
+        "changes": diff,
+    }
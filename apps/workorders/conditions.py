@@ -0,0 +1,259 @@
+"""
+Streaming evaluator for MaintenancePolicy(type="condition").
+
+A threshold such as {"temp_motor": {">": 85, "for": "5m"}} compiles to a Rule; samples
+are fed in micro-batches and a rule fires once per excursion when its predicate has held
+for the whole duration. Firing raises a CM WorkOrder plus a queued NotificationLog.
+
+Excursion state lives in the evaluating process only. A "for" window is only seen whole
+when every sample of a robot reaches the same process, so uploads do not evaluate: each
+ingested batch becomes a tasks.evaluate_condition_readings task, routed to the
+"conditions" queue that a single-process worker serves (CELERY_TASK_ROUTES, Procfile).
+Without a broker the batch is evaluated in the uploading process after commit, which only
+keeps whole windows when the app runs as one process.
+"""
+import operator
+import re
+from collections import defaultdict
+from typing import Callable, Iterable, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.fleet.models import Site
+from apps.notifications.models import NotificationLog, CHANNEL_SLACK
+from apps.notifications.tasks import queue_dispatch
+from .models import WorkOrder
+from .scope import get_scope_index
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# A gap longer than a rule's max_gap between two samples breaks its "for" window.
+# Unless the threshold sets "max_gap", it is half the duration but at least this.
+MIN_SAMPLE_GAP = 300.0
+
+_DURATION = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*$")
+_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_duration(value) -> float:
+    """
+    "30s" / "5m" / "2h" / "1d" / 90 -> seconds.
+    """
+    if value in (None, ""):
+        return 0.0
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    match = _DURATION.match(str(value))
+    if not match:
+        raise ValueError(f"invalid duration {value!r}")
+    return float(match.group(1)) * _UNITS[match.group(2)]
+
+
+class Rule:
+    __slots__ = ("policy_id", "metric", "op", "symbol", "limit", "duration", "max_gap")
+
+    def __init__(
+        self, policy_id: int, metric: str, symbol: str, limit: float, duration: float = 0.0,
+        max_gap: Optional[float] = None,
+    ):
+        self.policy_id = policy_id
+        self.metric = metric
+        self.symbol = symbol
+        self.op = OPERATORS[symbol]
+        self.limit = limit
+        self.duration = duration
+        self.max_gap = max_gap if max_gap else max(MIN_SAMPLE_GAP, duration / 2)
+
+    def describe(self) -> str:
+        text = f"{self.metric} {self.symbol} {self.limit:g}"
+        return f"{text} for {self.duration:g}s" if self.duration else text
+
+
+def compile_threshold(policy_id: int, threshold) -> list:
+    """
+    Compile MaintenancePolicy.threshold into Rules. Bare values (as saved by the admin
+    form, e.g. {"battery": "80"}) mean "greater than". An optional "max_gap" (e.g. "15m")
+    is the longest silence between samples that keeps a "for" window going.
+    Invalid entries are skipped.
+    """
+    rules = []
+    if not isinstance(threshold, dict):
+        return rules
+    for metric, spec in threshold.items():
+        if not isinstance(spec, dict):
+            spec = {">": spec}
+        try:
+            duration = parse_duration(spec.get("for"))
+            max_gap = parse_duration(spec.get("max_gap"))
+            for symbol in OPERATORS:
+                if symbol in spec:
+                    rules.append(Rule(policy_id, str(metric), symbol, float(spec[symbol]), duration, max_gap))
+        except (TypeError, ValueError):
+            continue
+    return rules
+
+
+class ConditionEvaluator:
+    """
+    Keeps three slots per (robot, rule): when the current excursion started, the last
+    sample time, and whether the excursion has already fired.
+    """
+
+    def __init__(self, rules: Iterable[Rule], policies_for_robot: Optional[Callable[[int], set]] = None):
+        self.rules_by_metric = defaultdict(list)
+        for rule in rules:
+            self.rules_by_metric[rule.metric].append(rule)
+        self.policies_for_robot = policies_for_robot
+        self.state = {}  # (robot_id, id(rule)) -> [breach_since, last_ts, fired]
+        self.evaluations = 0
+
+    def evaluate(self, samples: Iterable[tuple]) -> list:
+        """
+        Feed (robot_id, metric, value, ts) samples; ts is a datetime or epoch seconds.
+        Returns [(robot_id, rule, value, ts), ...] for rules that fired in this batch.
+        """
+        fired = []
+        rules_by_metric = self.rules_by_metric
+        state = self.state
+        scoped = {}
+
+        ordered = sorted(
+            (s for s in samples if s[1] in rules_by_metric),
+            key=lambda s: s[3],
+        )
+        for robot_id, metric, value, ts in ordered:
+            seconds = ts.timestamp() if hasattr(ts, "timestamp") else float(ts)
+            if self.policies_for_robot is not None:
+                allowed = scoped.get(robot_id)
+                if allowed is None:
+                    allowed = scoped[robot_id] = self.policies_for_robot(robot_id)
+            else:
+                allowed = None
+
+            for rule in rules_by_metric[metric]:
+                if allowed is not None and rule.policy_id not in allowed:
+                    continue
+                self.evaluations += 1
+                key = (robot_id, id(rule))
+                slot = state.get(key)
+                if slot is None:
+                    slot = state[key] = [None, seconds, False]
+                elif seconds - slot[1] > rule.max_gap:
+                    slot[0] = None
+                slot[1] = seconds
+
+                if not rule.op(value, rule.limit):
+                    slot[0] = None
+                    slot[2] = False
+                    continue
+                if slot[0] is None:
+                    slot[0] = seconds
+                if not slot[2] and seconds - slot[0] >= rule.duration:
+                    slot[2] = True
+                    fired.append((robot_id, rule, value, ts))
+        return fired
+
+
+_evaluator: Optional[ConditionEvaluator] = None
+_evaluator_key = None
+
+
+def get_evaluator() -> ConditionEvaluator:
+    """
+    Process-wide evaluator; recompiled (dropping state) when condition policies change.
+    State is per process: see the module docstring about routing a robot's samples.
+    """
+    global _evaluator, _evaluator_key
+    index = get_scope_index()
+    policies = sorted(
+        (p for p in index.policies.values() if p.type == "condition" and p.threshold),
+        key=lambda p: p.id,
+    )
+    key = tuple((p.id, p.updated_at) for p in policies)
+    if _evaluator is None or key != _evaluator_key:
+        rules = [rule for p in policies for rule in compile_threshold(p.id, p.threshold)]
+        _evaluator = ConditionEvaluator(rules, policies_for_robot=index.policies_for_robot)
+        _evaluator_key = key
+    return _evaluator
+
+
+def raise_alerts(fired: list, now=None) -> int:
+    """
+    Create a CM WorkOrder and a queued Slack NotificationLog per fired (robot, policy),
+    skipping pairs that already have an open CM order. Returns orders created.
+    """
+    if not fired:
+        return 0
+    now = now or timezone.now()
+    index = get_scope_index()
+
+    latest = {}
+    for robot_id, rule, value, ts in fired:
+        latest[(robot_id, rule.policy_id)] = (rule, value)
+
+    open_pairs = set(
+        WorkOrder.objects.filter(
+            type="CM",
+            status__in=WorkOrder.OPEN_STATUSES,
+            robot_id__in={r for r, _ in latest},
+            policy_id__in={p for _, p in latest},
+        ).values_list("robot_id", "policy_id")
+    )
+
+    orders = []
+    for (robot_id, policy_id), (rule, value) in latest.items():
+        robot = index.robots.get(robot_id)
+        policy = index.policies.get(policy_id)
+        if (robot_id, policy_id) in open_pairs or not robot or not policy or robot["site_id"] is None:
+            continue
+        orders.append(
+            WorkOrder(
+                robot_id=robot_id,
+                site_id=robot["site_id"],
+                policy_id=policy_id,
+                type="CM",
+                priority=policy.priority or "P2",
+                due_by=now,
+                nominal_due_by=now,
+                notes=f"Condition: {rule.describe()} (last value {value:g})",
+            )
+        )
+
+    with transaction.atomic():
+        WorkOrder.objects.bulk_create(orders)
+        channels = dict(
+            Site.objects.filter(id__in={wo.site_id for wo in orders}).values_list("id", "slack_channel")
+        )
+        logs = []
+        for wo in orders:
+            robot = index.robots[wo.robot_id]
+            logs.append(
+                NotificationLog(
+                    channel=CHANNEL_SLACK,
+                    to=channels.get(wo.site_id) or "#ops",
+                    subject=f"Condition alert: {robot['model']} (robot {wo.robot_id})",
+                    message=wo.notes,
+                    work_order_id=wo.id,
+                    maintenance_policy_id=wo.policy_id,
+                )
+            )
+        NotificationLog.objects.bulk_create(logs)
+        if logs:
+            queue_dispatch([row.id for row in logs])  # bulk_create skips post_save
+    return len(orders)
+
+
+def evaluate_readings(rows: Iterable[tuple]) -> int:
+    """
+    Evaluate one ingested batch and raise alerts (tasks.evaluate_condition_readings, or the
+    upload itself when there is no broker).
+    """
+    return raise_alerts(get_evaluator().evaluate(rows))
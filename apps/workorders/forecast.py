@@ -0,0 +1,158 @@
+"""
+Read-only projection of future PM orders for time-based policies.
+
+Nothing is written: for each (robot, policy) pair the next due date is the open order's
+due_by (or what the planner would create today), and each later occurrence follows every
+`interval_days`. Pairs are counted per (site, priority, interval, first due date) with SQL
+aggregates and set intersections and each distinct schedule is projected once, so the
+projection grows with distinct schedules rather than with robots. Which in-scope robots
+still need a planner order is decided per robot (one row per live robot/policy pair), so
+a robot with two open orders or an order for a robot that left the scope cannot stand in
+for another robot's missing one.
+"""
+import hashlib
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from dateutil.relativedelta import relativedelta
+
+from apps.fleet.models import Robot, Site
+from apps.policies.models import MaintenancePolicy
+from maint_app.versioning import fingerprint
+from .models import WorkOrder
+from .scope import get_scope_index
+
+CACHE_TIMEOUT = 60 * 60
+MAX_MONTHS = 12
+
+
+def _version() -> tuple:
+    """
+    Cheap fingerprint of everything the forecast depends on.
+    """
+    return tuple(
+        fingerprint(qs)
+        for qs in (
+            MaintenancePolicy.objects.all(),
+            Robot.objects.all(),
+            Site.objects.all(),
+            WorkOrder.objects.filter(status__in=WorkOrder.OPEN_STATUSES),
+        )
+    )
+
+
+def _week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def build_forecast(months: int = 3, now=None) -> dict:
+    """
+    Count projected PM occurrences per (week, site, priority) over the next `months`.
+    """
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    horizon = today + relativedelta(months=+months)
+    index = get_scope_index()
+
+    policies = [
+        p for p in index.policies.values()
+        if p.type == "time" and p.interval_days and p.interval_days > 0
+    ]
+
+    # Open orders already on the calendar, counted per (policy, site, due date) in SQL.
+    max_window = max((p.window_days or 0 for p in policies), default=0)
+    booked = defaultdict(Counter)  # policy_id -> {(site_id, due date): n}
+    for row in (
+        WorkOrder.objects.filter(
+            status__in=WorkOrder.OPEN_STATUSES,
+            policy_id__in=[p.id for p in policies],
+            due_by__gte=now - relativedelta(days=max_window),
+        )
+        .annotate(due_day=TruncDate("due_by"))
+        .values("policy_id", "site_id", "due_day")
+        .annotate(n=Count("id"))
+    ):
+        booked[row["policy_id"]][(row["site_id"], row["due_day"])] += row["n"]
+
+    # policy_id -> {robot_id: latest open due date}
+    live = defaultdict(dict)
+    for row in (
+        WorkOrder.objects.filter(
+            status__in=WorkOrder.OPEN_STATUSES,
+            policy_id__in=[p.id for p in policies],
+            due_by__gte=now - relativedelta(days=max_window),
+        )
+        .values("policy_id", "robot_id")
+        .annotate(last_due=Max("due_by"))
+    ):
+        live[row["policy_id"]][row["robot_id"]] = timezone.localdate(row["last_due"])
+
+    # (site_id, priority, interval_days, first due date) -> number of robots
+    schedules = Counter()
+    for pol in policies:
+        window_start = timezone.localdate(now - relativedelta(days=pol.window_days or 0))
+        default_first = timezone.localdate(now + relativedelta(days=+pol.interval_days))
+        priority = pol.priority or "P2"
+
+        for (site_id, due_day), n in booked.get(pol.id, {}).items():
+            if due_day >= window_start:
+                schedules[(site_id, priority, pol.interval_days, due_day)] += n
+
+        # Robots in scope without a live order get one from the planner today.
+        in_scope = index.robots_for_policy(pol.id)
+        covered = {robot_id for robot_id, due_day in live[pol.id].items() if due_day >= window_start}
+        for site_id, missing in index.count_by_site(in_scope - covered).items():
+            schedules[(site_id, priority, pol.interval_days, default_first)] += missing
+
+    buckets = Counter()
+    step_cache = {}
+    for (site_id, priority, interval, first), n in schedules.items():
+        weeks = step_cache.get((interval, first))
+        if weeks is None:
+            weeks = []
+            day = first
+            while day <= horizon:
+                if day >= today:
+                    weeks.append(_week_start(day))
+                day += timedelta(days=interval)
+            step_cache[(interval, first)] = weeks
+        for week in weeks:
+            buckets[(week, site_id, priority)] += n
+
+    site_names = index.site_names
+    rows = [
+        {
+            "week": week.isoformat(),
+            "site": site_id,
+            "site_name": site_names.get(site_id, ""),
+            "priority": priority,
+            "count": n,
+        }
+        for (week, site_id, priority), n in sorted(buckets.items(), key=lambda kv: (kv[0][0], kv[0][1], kv[0][2]))
+    ]
+    return {
+        "generated_at": now.isoformat(),
+        "months": months,
+        "start": today.isoformat(),
+        "end": horizon.isoformat(),
+        "total": sum(buckets.values()),
+        "buckets": rows,
+    }
+
+
+def get_forecast(months: int = 3) -> dict:
+    """
+    Cached build_forecast, keyed on the day, the horizon and the policy/robot/order versions.
+    """
+    months = max(1, min(MAX_MONTHS, int(months)))
+    source = repr((timezone.localdate().isoformat(), months, _version()))
+    key = "workorders:forecast:" + hashlib.md5(source.encode()).hexdigest()
+    result = cache.get(key)
+    if result is None:
+        result = build_forecast(months)
+        cache.set(key, result, CACHE_TIMEOUT)
+    return result
@@ -0,0 +1,190 @@
+"""
+Capacity-aware due-date leveling.
+
+Each Site may set `daily_capacity`. New orders keep the planner's nominal due date when
+that day has room, otherwise they move to the latest day in [nominal - window_days,
+nominal] with spare capacity (or the least-loaded day in that window if all are full). Loads are
+kept per site in a flat array indexed by day offset, so placing an order is a short
+scan of its window. The window always hangs off the order's nominal_due_by, never its
+current due_by, so repeated passes cannot walk an order out of its window.
+"""
+from array import array
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.fleet.models import Site
+from .models import WorkOrder
+
+
+class CapacityCalendar:
+    """
+    Open-order counts per (site, day) for sites that have a daily capacity.
+    """
+
+    def __init__(self, start, days: int, capacity: dict):
+        self.start = start
+        self.days = days
+        self.capacity = capacity  # site_id -> orders per day
+        self.load = {site_id: array("i", [0]) * days for site_id in capacity}
+
+    @classmethod
+    def load_for(cls, site_ids, start, days: int) -> "CapacityCalendar":
+        capacity = dict(
+            Site.objects.filter(id__in=set(site_ids), daily_capacity__isnull=False).values_list("id", "daily_capacity")
+        )
+        calendar = cls(start, days, capacity)
+        if capacity:
+            rows = (
+                WorkOrder.objects.filter(
+                    site_id__in=capacity,
+                    status__in=WorkOrder.OPEN_STATUSES,
+                    due_by__date__gte=start,
+                    due_by__date__lt=start + timedelta(days=days),
+                )
+                .annotate(day=TruncDate("due_by"))
+                .values("site_id", "day")
+                .annotate(n=Count("id"))
+            )
+            for row in rows:
+                calendar.load[row["site_id"]][(row["day"] - start).days] += row["n"]
+        return calendar
+
+    def _offset(self, day) -> int:
+        return min(max((day - self.start).days, 0), self.days - 1)
+
+    def place(self, site_id: int, earliest, latest):
+        """
+        Pick a day in [earliest, latest] for one order at `site_id` and book it.
+        Returns the chosen date, or `latest` unchanged for sites without a capacity.
+        """
+        loads = self.load.get(site_id)
+        if loads is None:
+            return latest
+        cap = self.capacity[site_id]
+        lo, hi = self._offset(earliest), self._offset(latest)
+
+        best = hi
+        for i in range(hi, lo - 1, -1):
+            if loads[i] < cap:
+                best = i
+                break
+            if loads[i] < loads[best]:
+                best = i
+        loads[best] += 1
+        return self.start + timedelta(days=best)
+
+    def release(self, site_id: int, day) -> None:
+        loads = self.load.get(site_id)
+        if loads is not None:
+            loads[self._offset(day)] -= 1
+
+    def room(self, site_id: int, day):
+        """
+        Orders `day` can still take at `site_id`, or None for sites without a capacity.
+        """
+        loads = self.load.get(site_id)
+        if loads is None:
+            return None
+        return max(self.capacity[site_id] - loads[self._offset(day)], 0)
+
+    def move(self, site_id: int, from_day, to_day) -> None:
+        loads = self.load.get(site_id)
+        if loads is not None:
+            loads[self._offset(from_day)] -= 1
+            loads[self._offset(to_day)] += 1
+
+
+def level_new_orders(orders: list, windows: dict, now=None) -> int:
+    """
+    Shift the due_by of unsaved WorkOrders so each site's days stay within capacity.
+    `windows` maps policy_id -> window_days. Returns how many orders were moved.
+    """
+    if not orders:
+        return 0
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    last = max(timezone.localdate(wo.due_by) for wo in orders)
+    calendar = CapacityCalendar.load_for({wo.site_id for wo in orders}, today, (last - today).days + 1)
+    if not calendar.capacity:
+        return 0
+
+    moved = 0
+    for wo in sorted(orders, key=lambda o: (o.due_by, o.priority)):
+        if wo.site_id not in calendar.capacity:
+            continue
+        earliest, latest = wo.due_window(windows.get(wo.policy_id))
+        current = timezone.localdate(wo.due_by)
+        day = calendar.place(wo.site_id, max(today, timezone.localdate(earliest)), timezone.localdate(latest))
+        if day != current:
+            wo.due_by += timedelta(days=(day - current).days)
+            moved += 1
+    return moved
+
+
+def rebalance(site_ids=None, horizon_days: int = 90, dry_run: bool = False, now=None) -> dict:
+    """
+    Leveling pass over existing planned orders: only days over capacity give up orders,
+    each moving to the latest day in its policy window with room. Days already within
+    capacity are untouched, so re-running the pass is a no-op.
+    """
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    sites = Site.objects.filter(daily_capacity__isnull=False)
+    if site_ids is not None:
+        sites = sites.filter(id__in=site_ids)
+    site_ids = list(sites.values_list("id", flat=True))
+    calendar = CapacityCalendar.load_for(site_ids, today, horizon_days)
+
+    candidates = defaultdict(list)  # (site_id, offset) -> movable orders, latest-created first
+    for wo in (
+        WorkOrder.objects.filter(
+            site_id__in=site_ids,
+            status="planned",
+            assigned_to__isnull=True,
+            due_by__date__gte=today,
+            due_by__date__lt=today + timedelta(days=horizon_days),
+        )
+        .select_related("policy")
+        .order_by("-created_at", "-id")
+    ):
+        candidates[(wo.site_id, (timezone.localdate(wo.due_by) - today).days)].append(wo)
+
+    moved = []
+    for site_id in calendar.capacity:
+        cap = calendar.capacity[site_id]
+        loads = calendar.load[site_id]
+        for offset in range(calendar.days):
+            movable = candidates.get((site_id, offset), [])
+            while loads[offset] > cap and movable:
+                wo = movable.pop(0)
+                earliest, latest = wo.due_window()
+                day = today + timedelta(days=offset)
+                loads[offset] -= 1
+                target = calendar.place(
+                    site_id, max(today, timezone.localdate(earliest)), timezone.localdate(latest)
+                )
+                if target == day or loads[(target - today).days] > cap:
+                    # Nowhere better in the window; leave it where it was.
+                    calendar.release(site_id, target)
+                    loads[offset] += 1
+                    break
+                wo.due_by += timedelta(days=(target - day).days)
+                moved.append(wo)
+
+    if moved and not dry_run:
+        with transaction.atomic():
+            for wo in moved:
+                WorkOrder.objects.filter(id=wo.id, status="planned").update(
+                    due_by=wo.due_by, last_reminder_days=None, updated_at=timezone.now()
+                )
+
+    return {
+        "dry_run": dry_run,
+        "moved": len(moved),
+        "changes": [{"work_order": wo.id, "site": wo.site_id, "due_by": wo.due_by.isoformat()} for wo in moved],
+    }
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from apps.workorders.assignment import assign_work_orders
+
+
+class Command(BaseCommand):
+    help = "Assign unassigned planned work orders to Technicians, balancing load and preferring site affinity."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=14, help="Horizon: orders due within this many days")
+        parser.add_argument("--dry-run", action="store_true", help="Print the changes without writing them")
+
+    def handle(self, *args, **options):
+        result = assign_work_orders(horizon_days=options["days"], dry_run=options["dry_run"])
+
+        if options["dry_run"]:
+            for change in result["changes"]:
+                self.stdout.write(
+                    f"WO#{change['work_order']} (site {change['site']}, due {change['due_by'][:10]}): "
+                    f"{change['from'] or 'unassigned'} -> {change['to']}"
+                )
+        for name, n in sorted(result["by_technician"].items()):
+            self.stdout.write(f"{name}: +{n}")
+
+        verb = "Would assign" if options["dry_run"] else "Assigned"
+        count = result["planned"] if options["dry_run"] else result["applied"]
+        self.stdout.write(self.style.SUCCESS(f"{verb} {count} work order(s)"))
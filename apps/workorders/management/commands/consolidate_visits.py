@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from apps.workorders.visits import GROUP_BY, consolidate_visits
+
+
+class Command(BaseCommand):
+    help = "Merge open PM work orders with overlapping windows into visits."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--group-by", choices=GROUP_BY, default="site", help="Merge across a site or per robot")
+        parser.add_argument("--site", type=int, action="append", dest="sites", help="Only this site id (repeatable)")
+        parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+
+    def handle(self, *args, **options):
+        result = consolidate_visits(
+            group_by=options["group_by"], site_ids=options["sites"], dry_run=options["dry_run"]
+        )
+        verb = "Would consolidate" if options["dry_run"] else "Consolidated"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb} {result['orders']} order(s): {result['visits_created']} visit(s) created, "
+                f"{result['visits_updated']} updated, {result['visits_removed']} merged away"
+            )
+        )
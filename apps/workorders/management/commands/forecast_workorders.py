@@ -0,0 +1,27 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from apps.workorders.forecast import get_forecast, MAX_MONTHS
+
+
+class Command(BaseCommand):
+    help = "Project upcoming PM work orders per week, site and priority without creating any."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months", type=int, default=3, help=f"Horizon in months (1–{MAX_MONTHS})")
+        parser.add_argument("--json", action="store_true", help="Print the raw JSON result")
+
+    def handle(self, *args, **options):
+        result = get_forecast(options["months"])
+        if options["json"]:
+            self.stdout.write(json.dumps(result, indent=2))
+            return
+
+        self.stdout.write(f"{'Week':<12} {'Site':<30} {'Priority':<8} {'Orders':>7}")
+        for row in result["buckets"]:
+            site = row["site_name"] or f"#{row['site']}"
+            self.stdout.write(f"{row['week']:<12} {site[:30]:<30} {row['priority']:<8} {row['count']:>7}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['total']} projected order(s) between {result['start']} and {result['end']}"
+        ))
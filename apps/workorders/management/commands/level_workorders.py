@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from apps.workorders.leveling import rebalance
+
+
+class Command(BaseCommand):
+    help = "Move planned work orders off days that exceed their site's daily capacity (within each policy window)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=90, help="Horizon in days")
+        parser.add_argument("--site", type=int, action="append", dest="sites", help="Only this site id (repeatable)")
+        parser.add_argument("--dry-run", action="store_true", help="Print the changes without writing them")
+
+    def handle(self, *args, **options):
+        result = rebalance(site_ids=options["sites"], horizon_days=options["days"], dry_run=options["dry_run"])
+        for change in result["changes"]:
+            self.stdout.write(f"WO#{change['work_order']} (site {change['site']}) -> {change['due_by'][:10]}")
+        verb = "Would move" if options["dry_run"] else "Moved"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {result['moved']} work order(s)"))
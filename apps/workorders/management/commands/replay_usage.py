@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from apps.workorders.usage import replay_usage
+
+
+class Command(BaseCommand):
+    help = "Rebuild usage-policy running totals from stored counter readings and raise due orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--policy", type=int, action="append", dest="policies",
+                            help="Only replay this policy id (repeatable)")
+        parser.add_argument("--chunk-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        summary = replay_usage(policy_ids=options["policies"], chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Replayed {summary['readings']} readings into {summary['pairs']} pairs; "
+            f"{summary['orders_created']} order(s) created"
+        ))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0005_counterreading'),
+        ('policies', '0001_initial'),
+        ('workorders', '0002_plannerstate_workorder_wo_status_updated_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsageState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.FloatField(default=0)),
+                ('since', models.DateTimeField(blank=True, null=True)),
+                ('triggered', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('policy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='policies.maintenancepolicy')),
+                ('robot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='fleet.robot')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('robot', 'policy'), name='usage_state_robot_policy_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0007_site_organization'),
+        ('policies', '0001_initial'),
+        ('workorders', '0005_reminder_marker'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workorder',
+            index=models.Index(fields=['site', 'due_by'], name='wo_site_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workorder',
+            index=models.Index(fields=['assigned_to', 'due_by'], name='wo_assignee_due_idx'),
+        ),
+    ]
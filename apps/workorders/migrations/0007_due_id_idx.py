@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0008_robot_model_serial_idx'),
+        ('policies', '0001_initial'),
+        ('workorders', '0006_calendar_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workorder',
+            index=models.Index(fields=['due_by', 'id'], name='wo_due_id_idx'),
+        ),
+    ]
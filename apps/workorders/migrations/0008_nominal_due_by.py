@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:20
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill(apps, schema_editor):
+    # Existing orders: their current date is the best nominal date there is.
+    WorkOrder = apps.get_model("workorders", "WorkOrder")
+    WorkOrder.objects.filter(nominal_due_by__isnull=True).update(nominal_due_by=F("due_by"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workorders', '0007_due_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workorder',
+            name='nominal_due_by',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,5 @@
+from datetime import timedelta
+
 from django.db import models
 from django.contrib.auth import get_user_model
 from apps.fleet.models import Robot, Site
@@ -24,6 +26,12 @@ class WorkOrder(models.Model):
         ("completed", "Completed"),
         ("cancelled", "Cancelled"),
     )
+    # The one definition of "open": anything not completed or cancelled. Capacity, workload,
+    # duplicate checks and planning count in-progress work as open.
+    OPEN_STATUSES = ("planned", "assigned", "in_progress")
+    # Open and not started yet: what may still be re-dated (visits) or reminded about.
+    NOT_STARTED_STATUSES = ("planned", "assigned")
+    CLOSED_STATUSES = ("completed", "cancelled")
 
     robot = models.ForeignKey(Robot, on_delete=models.PROTECT)
     site = models.ForeignKey(Site, on_delete=models.PROTECT)
@@ -35,6 +43,9 @@ class WorkOrder(models.Model):
     priority = models.CharField(max_length=4, default="P2")
 
     due_by = models.DateTimeField()
+    # The date the order was planned for. Leveling, rebalance and visits only move due_by
+    # within [nominal_due_by - policy.window_days, nominal_due_by] (see due_window()).
+    nominal_due_by = models.DateTimeField(null=True, blank=True)
     status = models.CharField(max_length=16, choices=STATUS_CHOICES, default="planned")
 
     assigned_to = models.ForeignKey(
@@ -46,10 +57,115 @@ class WorkOrder(models.Model):
     )
 
     notes = models.TextField(blank=True)
+    visit = models.ForeignKey(
+        "Visit", on_delete=models.SET_NULL, null=True, blank=True, related_name="work_orders"
+    )
+    # Smallest T-minus-days reminder already sent (14, 3, 0); null until the first one goes out.
+    # Cleared whenever due_by moves, so the new date gets its own reminders.
+    last_reminder_days = models.PositiveSmallIntegerField(null=True, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # completions/cancellations since the planner's high-water mark
+            models.Index(fields=["status", "updated_at"], name="wo_status_updated_idx"),
+            # reminder buckets: open orders due on a given day
+            models.Index(fields=["status", "due_by"], name="wo_status_due_idx"),
+            # calendar feeds: one site's / technician's orders in a due_by window
+            models.Index(fields=["site", "due_by"], name="wo_site_due_idx"),
+            models.Index(fields=["assigned_to", "due_by"], name="wo_assignee_due_idx"),
+            # API list ordering / keyset pagination
+            models.Index(fields=["due_by", "id"], name="wo_due_id_idx"),
+        ]
+
     def __str__(self) -> str:
         return f"WO#{self.id} - {self.robot} due {self.due_by:%Y-%m-%d}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_due_by = instance.__dict__.get("due_by")
+        return instance
+
+    def save(self, *args, **kwargs):
+        # A due_by set by hand (admin, API, portal) becomes the new nominal date and re-arms
+        # the reminders.
+        moved = self.due_by != getattr(self, "_loaded_due_by", self.due_by)
+        if self.nominal_due_by is None or moved:
+            self.nominal_due_by = self.due_by
+            fields = {"nominal_due_by"}
+            if moved:
+                self.last_reminder_days = None
+                fields.add("last_reminder_days")
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], *fields}
+        super().save(*args, **kwargs)
+        self._loaded_due_by = self.due_by
+
+    def due_window(self, window_days: int = None) -> tuple:
+        """
+        (earliest, latest) due_by this order may be moved to without leaving its policy
+        window. Pass `window_days` to avoid loading the policy.
+        """
+        nominal = self.nominal_due_by or self.due_by
+        if window_days is None:
+            window_days = self.policy.window_days if self.policy_id else 0
+        return nominal - timedelta(days=window_days or 0), nominal
+
+
+class PlannerState(models.Model):
+    """
+    Persisted high-water mark for the incremental planner (one row per planner).
+    """
+
+    name = models.CharField(max_length=32, unique=True)
+    high_water_mark = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.name} @ {self.high_water_mark}"
+
+
+class UsageState(models.Model):
+    """
+    Running usage total for a (robot, usage policy) pair since the pair's last completed
+    WorkOrder. Maintained incrementally by apps.workorders.usage.
+    """
+
+    robot = models.ForeignKey(Robot, on_delete=models.CASCADE)
+    policy = models.ForeignKey(MaintenancePolicy, on_delete=models.CASCADE)
+    total = models.FloatField(default=0)
+    since = models.DateTimeField(null=True, blank=True)  # last completion; readings before it don't count
+    triggered = models.BooleanField(default=False)       # an order was raised for the current cycle
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["robot", "policy"], name="usage_state_robot_policy_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.robot_id}/{self.policy_id}: {self.total:g}"
+
+
+class Visit(models.Model):
+    """
+    One technician trip covering several open work orders whose windows overlap.
+    `robot` is set when every order is for the same robot; site-wide visits leave it empty.
+    """
+
+    site = models.ForeignKey(Site, on_delete=models.CASCADE, related_name="visits")
+    robot = models.ForeignKey(Robot, on_delete=models.SET_NULL, null=True, blank=True, related_name="visits")
+
+    window_start = models.DateTimeField()
+    window_end = models.DateTimeField()
+    due_by = models.DateTimeField()
+    checklist_ids = models.JSONField(default=list, blank=True)  # merged from the orders' policies
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"Visit#{self.id} - {self.site} due {self.due_by:%Y-%m-%d}"
@@ -0,0 +1,231 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Iterable, Optional
+
+from django.db import connection, transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+from dateutil.relativedelta import relativedelta
+
+from apps.fleet.models import Robot, Site
+from apps.policies.models import MaintenancePolicy
+from .leveling import level_new_orders
+from .models import WorkOrder, PlannerState
+from .scope import get_scope_index
+
+INCREMENTAL_PLANNER = "time"
+
+# updated_at is stamped when a row is saved, not when its transaction commits, so a save
+# can land behind a mark that was already taken. Each run looks this far behind the mark;
+# re-planning a pair twice is harmless. Must exceed the longest write transaction.
+CHANGE_LAG = timedelta(minutes=5)
+
+
+@contextmanager
+def count_queries():
+    """
+    Count the SQL statements issued inside the block: `with count_queries() as n: ...; n[0]`.
+    """
+    counter = [0]
+
+    def wrapper(execute, sql, params, many, context):
+        counter[0] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield counter
+
+
+def _time_policies(index) -> list:
+    return [
+        p for p in index.policies.values()
+        if p.type == "time" and p.interval_days and p.interval_days > 0
+    ]
+
+
+def plan_work_orders(now=None, pairs: Optional[Iterable[tuple]] = None, site_id: Optional[int] = None) -> dict:
+    """
+    Set-based planner for time-based policies.
+
+    Matches policies to robots through the scope index, loads the latest open order
+    per (robot, policy) in one query, works out the missing pairs in memory and
+    inserts them with one bulk_create after leveling their due dates against site
+    capacity. Returns a summary: pairs evaluated, orders created, queries issued.
+
+    `pairs` restricts the run to the given (robot_id, policy_id) candidates; pairs
+    that no longer match the policy scope are dropped. None plans the whole fleet.
+    `site_id` restricts the run to robots currently at that site (one planning shard).
+    """
+    now = now or timezone.now()
+    summary = {"pairs_evaluated": 0, "created": 0, "leveled": 0, "queries": 0}
+
+    with count_queries() as queries:
+        index = get_scope_index()
+        policies = _time_policies(index)
+
+        wanted = None
+        if pairs is not None:
+            wanted = defaultdict(set)
+            for robot_id, policy_id in pairs:
+                wanted[policy_id].add(robot_id)
+            policies = [p for p in policies if p.id in wanted]
+
+        shard_robots = index.robots_at_sites([site_id]) if site_id is not None else None
+
+        open_orders = WorkOrder.objects.filter(status__in=WorkOrder.OPEN_STATUSES, policy__isnull=False)
+        if wanted is not None:
+            open_orders = open_orders.filter(robot_id__in=set().union(*wanted.values()))
+        if shard_robots is not None:
+            open_orders = open_orders.filter(robot_id__in=shard_robots)
+
+        # (robot_id, policy_id) -> latest open due_by
+        latest_open = {}
+        if policies:
+            latest_open = {
+                (row["robot_id"], row["policy_id"]): row["latest_due"]
+                for row in open_orders.values("robot_id", "policy_id").annotate(latest_due=Max("due_by"))
+            }
+
+        new_orders = []
+        for pol in policies:
+            window_start = now - relativedelta(days=pol.window_days or 0)
+            due_by = now + relativedelta(days=+pol.interval_days)
+
+            robot_ids = index.robots_for_policy(pol.id)
+            if wanted is not None:
+                robot_ids &= wanted[pol.id]
+            if shard_robots is not None:
+                robot_ids &= shard_robots
+
+            for robot_id in sorted(robot_ids):
+                robot = index.robots[robot_id]
+                summary["pairs_evaluated"] += 1
+
+                latest = latest_open.get((robot["id"], pol.id))
+                if latest is not None and latest >= window_start:
+                    continue
+                # WorkOrder.site is required; robots without a site cannot be scheduled.
+                if robot["site_id"] is None:
+                    continue
+
+                new_orders.append(
+                    WorkOrder(
+                        robot_id=robot["id"],
+                        site_id=robot["site_id"],
+                        policy=pol,
+                        type="PM",
+                        priority=pol.priority or "P2",
+                        due_by=due_by,
+                        nominal_due_by=due_by,
+                    )
+                )
+
+        if new_orders:
+            # Spread due dates within each policy window so no site day exceeds its capacity.
+            summary["leveled"] = level_new_orders(new_orders, {p.id: p.window_days for p in policies}, now=now)
+            with transaction.atomic():
+                WorkOrder.objects.bulk_create(new_orders, batch_size=1000)
+        summary["created"] = len(new_orders)
+
+    summary["queries"] = queries[0]
+    return summary
+
+
+def lock_sites(site_ids) -> list:
+    """
+    Lock Site rows (in id order, so lockers cannot deadlock) for the current transaction.
+    Every planner that inserts orders for a site holds its row, so shards, retries and
+    the incremental planner never plan the same robot at once. None locks every site.
+    """
+    sites = Site.objects.select_for_update().order_by("id")
+    if site_ids is not None:
+        sites = sites.filter(id__in=site_ids)
+    return list(sites.values_list("id", flat=True))
+
+
+def plan_site(site_id: int, now=None) -> dict:
+    """
+    Plan one site's robots as an independent shard.
+
+    The site row is locked for the duration so a retried shard, its original and the
+    incremental planner cannot both insert orders for the same robots.
+    """
+    with transaction.atomic():
+        locked = lock_sites([site_id])
+        if not locked:
+            summary = {"pairs_evaluated": 0, "created": 0, "leveled": 0, "queries": 0}
+        else:
+            summary = plan_work_orders(now, site_id=site_id)
+    summary["site_id"] = site_id
+    return summary
+
+
+def changed_pairs(since, now) -> set:
+    """
+    (robot_id, policy_id) pairs that may need a new order because something changed
+    after `since`: edited policies, robots or sites, orders completed or cancelled,
+    and open orders whose window rolled over between `since` and `now`.
+    """
+    index = get_scope_index()
+    pairs = set()
+
+    robot_ids = set(Robot.objects.filter(updated_at__gt=since).values_list("id", flat=True))
+    site_ids = Site.objects.filter(updated_at__gt=since).values_list("id", flat=True)
+    robot_ids |= index.robots_at_sites(site_ids)
+    for robot_id in robot_ids:
+        pairs.update((robot_id, policy_id) for policy_id in index.policies_for_robot(robot_id))
+
+    policy_ids = MaintenancePolicy.objects.filter(updated_at__gt=since).values_list("id", flat=True)
+    for policy_id in policy_ids:
+        pairs.update((robot_id, policy_id) for robot_id in index.robots_for_policy(policy_id))
+
+    pairs.update(
+        WorkOrder.objects.filter(
+            status__in=WorkOrder.CLOSED_STATUSES, updated_at__gt=since, policy__isnull=False
+        ).values_list("robot_id", "policy_id")
+    )
+
+    # An open order only satisfies its pair while due_by >= now - window_days.
+    rolled = Q()
+    for pol in _time_policies(index):
+        window = relativedelta(days=pol.window_days or 0)
+        rolled |= Q(policy_id=pol.id, due_by__gte=since - window, due_by__lt=now - window)
+    if rolled:
+        pairs.update(
+            WorkOrder.objects.filter(rolled, status__in=WorkOrder.OPEN_STATUSES).values_list("robot_id", "policy_id")
+        )
+
+    return pairs
+
+
+def plan_incremental(now=None) -> dict:
+    """
+    Re-plan only what changed since the persisted high-water mark (minus CHANGE_LAG).
+
+    The first run (no mark yet) plans the whole fleet. The PlannerState row is locked
+    for the duration, so overlapping runs queue up instead of double-planning, and so are
+    the rows of the sites being planned, which serialises this run against site shards.
+    """
+    now = now or timezone.now()
+
+    with count_queries() as queries, transaction.atomic():
+        state, _ = PlannerState.objects.select_for_update().get_or_create(name=INCREMENTAL_PLANNER)
+        since = state.high_water_mark
+
+        if since is None:
+            lock_sites(None)
+            summary = plan_work_orders(now)
+        else:
+            pairs = changed_pairs(since - CHANGE_LAG, now)
+            index = get_scope_index()
+            lock_sites({index.robots[r]["site_id"] for r, _ in pairs if r in index.robots} - {None})
+            summary = plan_work_orders(now, pairs=pairs)
+            summary["pairs_changed"] = len(pairs)
+
+        state.high_water_mark = now
+        state.save(update_fields=["high_water_mark", "updated_at"])
+
+    summary["since"] = since.isoformat() if since else None
+    summary["queries"] = queries[0]
+    return summary
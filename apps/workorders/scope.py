@@ -0,0 +1,264 @@
+import time
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from apps.fleet.models import Robot, Site
+from apps.policies.models import MaintenancePolicy
+from maint_app.versioning import fingerprint
+
+# Scope keys a policy can restrict on, e.g. {"model": "Falcon28", "site": "Excyte", "tier": "P1"}.
+DIMENSIONS = ("model", "site", "tier", "environment")
+WILDCARD = "*"
+
+# Rebuild at least this often, to pick up a save whose updated_at is older than one
+# already counted in the version (it committed late) and so cannot move the version.
+INDEX_MAX_AGE = 300.0
+
+
+def scope_dict(policy: MaintenancePolicy) -> dict:
+    # The admin form can store scope as a list; treat anything but a dict as "no restriction".
+    return policy.scope if isinstance(policy.scope, dict) else {}
+
+
+def _scope_values(scope: dict, dim: str) -> Optional[set]:
+    """
+    Values a scope accepts for one dimension, or None when it is unrestricted.
+    A scope value may be a single string or a list of strings.
+    """
+    value = scope.get(dim)
+    if value in (None, "", WILDCARD):
+        return None
+    if isinstance(value, (list, tuple)):
+        values = {str(v) for v in value if v not in (None, "")}
+        return None if not values or WILDCARD in values else values
+    return {str(value)}
+
+
+def _robot_values(entry: dict, dim: str) -> set:
+    if dim == "environment":
+        envs = entry["environments"] or []
+        if isinstance(envs, dict):
+            return {str(k) for k, v in envs.items() if v}
+        return {str(e) for e in envs}
+    value = entry["site_name"] if dim == "site" else entry[dim]
+    return {str(value)} if value not in (None, "") else set()
+
+
+def scope_matches(entry: dict, scope: dict) -> bool:
+    """
+    Reference (non-indexed) match of one robot entry against one scope.
+    """
+    for dim in DIMENSIONS:
+        wanted = _scope_values(scope, dim)
+        if wanted is not None and not (wanted & _robot_values(entry, dim)):
+            return False
+    return True
+
+
+def robot_entry(robot: Robot, site_name: Optional[str] = None) -> dict:
+    return {
+        "id": robot.id,
+        "model": robot.model,
+        "site_id": robot.site_id,
+        "site_name": site_name,
+        "tier": robot.tier,
+        "environments": robot.environments,
+    }
+
+
+class ScopeIndex:
+    """
+    In-memory index of MaintenancePolicy.scope against the fleet.
+
+    Policies are bucketed per dimension by the values they accept (or under WILDCARD
+    when unrestricted), robots by the values they carry, so matching a robot or a
+    policy is a handful of set intersections instead of a scan.
+    """
+
+    def __init__(self):
+        self.policies = {}  # policy id -> MaintenancePolicy
+        self.robots = {}    # robot id -> robot entry dict
+        self.site_names = {}  # site id -> name
+        self._policy_buckets = {dim: defaultdict(set) for dim in DIMENSIONS}
+        self._policy_keys = {}  # policy id -> [(dim, value), ...]
+        self._robot_buckets = {dim: defaultdict(set) for dim in DIMENSIONS}
+        self._robot_keys = {}   # robot id -> [(dim, value), ...]
+        self._site_robots = defaultdict(set)
+
+    @classmethod
+    def build(cls) -> "ScopeIndex":
+        index = cls()
+        for pol in MaintenancePolicy.objects.all():
+            index.add_policy(pol)
+        index.site_names = dict(Site.objects.values_list("id", "name"))
+        for robot in Robot.objects.all():
+            index.add_robot(robot)
+        return index
+
+    # ---------- policies ----------
+    def add_policy(self, policy: MaintenancePolicy) -> None:
+        self.remove_policy(policy.id)
+        scope = scope_dict(policy)
+        keys = []
+        for dim in DIMENSIONS:
+            for value in _scope_values(scope, dim) or (WILDCARD,):
+                self._policy_buckets[dim][value].add(policy.id)
+                keys.append((dim, value))
+        self.policies[policy.id] = policy
+        self._policy_keys[policy.id] = keys
+
+    def remove_policy(self, policy_id: int) -> None:
+        for dim, value in self._policy_keys.pop(policy_id, ()):
+            self._policy_buckets[dim][value].discard(policy_id)
+        self.policies.pop(policy_id, None)
+
+    # ---------- robots ----------
+    def add_robot(self, robot: Robot) -> None:
+        self.remove_robot(robot.id)
+        if robot.site_id is not None and robot.site_id not in self.site_names:
+            # A site created since the index was built.
+            self.site_names[robot.site_id] = Site.objects.filter(id=robot.site_id).values_list("name", flat=True).first()
+        entry = robot_entry(robot, self.site_names.get(robot.site_id))
+        keys = []
+        for dim in DIMENSIONS:
+            for value in _robot_values(entry, dim):
+                self._robot_buckets[dim][value].add(robot.id)
+                keys.append((dim, value))
+        self.robots[robot.id] = entry
+        self._robot_keys[robot.id] = keys
+        if robot.site_id is not None:
+            self._site_robots[robot.site_id].add(robot.id)
+
+    def remove_robot(self, robot_id: int) -> None:
+        for dim, value in self._robot_keys.pop(robot_id, ()):
+            self._robot_buckets[dim][value].discard(robot_id)
+        entry = self.robots.pop(robot_id, None)
+        if entry and entry["site_id"] is not None:
+            self._site_robots[entry["site_id"]].discard(robot_id)
+
+    # ---------- sites ----------
+    def update_site(self, site_id: int, name: Optional[str]) -> None:
+        """
+        Re-key the robots of a site after it is renamed (name=None when deleted).
+        """
+        if name is None:
+            self.site_names.pop(site_id, None)
+        else:
+            self.site_names[site_id] = name
+        for robot_id in list(self._site_robots.get(site_id, ())):
+            entry = self.robots[robot_id]
+            old = entry["site_name"]
+            if old not in (None, ""):
+                self._robot_buckets["site"][str(old)].discard(robot_id)
+            entry["site_name"] = name
+            keys = [k for k in self._robot_keys[robot_id] if k[0] != "site"]
+            if name not in (None, ""):
+                self._robot_buckets["site"][str(name)].add(robot_id)
+                keys.append(("site", str(name)))
+            self._robot_keys[robot_id] = keys
+
+    # ---------- lookups ----------
+    def policies_for_robot(self, robot_id: int) -> set:
+        entry = self.robots.get(robot_id)
+        if entry is None:
+            return set()
+        result = None
+        for dim in DIMENSIONS:
+            buckets = self._policy_buckets[dim]
+            candidates = set(buckets.get(WILDCARD, ()))
+            for value in _robot_values(entry, dim):
+                candidates |= buckets.get(value, set())
+            result = candidates if result is None else result & candidates
+            if not result:
+                break
+        return result
+
+    def robots_for_policy(self, policy_id: int) -> set:
+        policy = self.policies.get(policy_id)
+        if policy is None:
+            return set()
+        scope = scope_dict(policy)
+        result = None
+        for dim in DIMENSIONS:
+            wanted = _scope_values(scope, dim)
+            if wanted is None:
+                continue
+            buckets = self._robot_buckets[dim]
+            candidates = set()
+            for value in wanted:
+                candidates |= buckets.get(value, set())
+            result = candidates if result is None else result & candidates
+            if not result:
+                break
+        return set(self.robots) if result is None else result
+
+    def count_by_site(self, robot_ids: set) -> dict:
+        """
+        site id -> how many of `robot_ids` are at that site (set intersections, no per-robot loop).
+        """
+        counts = {}
+        for site_id, members in self._site_robots.items():
+            n = len(members & robot_ids)
+            if n:
+                counts[site_id] = n
+        return counts
+
+    def robots_at_sites(self, site_ids: Iterable[int]) -> set:
+        result = set()
+        for site_id in site_ids:
+            result |= self._site_robots.get(site_id, set())
+        return result
+
+
+_index: Optional[ScopeIndex] = None
+_index_version = None
+_index_built_at = 0.0
+
+_VERSIONED = {MaintenancePolicy: "policies", Robot: "robots", Site: "sites"}
+
+
+def index_version() -> dict:
+    """
+    What the index was built from, read from the database so every process agrees:
+    row count and newest updated_at of policies, robots and sites (three aggregates).
+    """
+    return {name: fingerprint(model.objects.all()) for model, name in _VERSIONED.items()}
+
+
+def get_scope_index() -> ScopeIndex:
+    """
+    Return this process's index, rebuilding it when the database has moved on.
+    """
+    global _index, _index_version, _index_built_at
+    version = index_version()
+    if _index is None or version != _index_version or time.monotonic() - _index_built_at > INDEX_MAX_AGE:
+        # Version first: a change committed during the build leaves us behind, not ahead.
+        _index = ScopeIndex.build()
+        _index_version, _index_built_at = version, time.monotonic()
+    return _index
+
+
+def patch_scope_index(instance, apply, created: bool = False) -> None:
+    """
+    Apply `apply(index)` to the local index after a save of `instance` has committed
+    (signals.py defers the call with transaction.on_commit), and advance the index's
+    version by exactly this save. The next get_scope_index() keeps the patched copy
+    only if nothing else changed in between.
+    """
+    global _index_version
+    if _index is None:
+        return
+    name = _VERSIONED[type(instance)]
+    n, ts = _index_version[name]
+    apply(_index)
+    stamps = [t for t in (ts, instance.updated_at) if t is not None]
+    _index_version = {**_index_version, name: (n + 1 if created else n, max(stamps) if stamps else None)}
+
+
+def drop_scope_index() -> None:
+    """
+    Forget the local index after a committed delete; it is rebuilt on next use.
+    (A delete can lower Max(updated_at) by an unknown amount, so it cannot be patched.)
+    """
+    global _index
+    _index = None
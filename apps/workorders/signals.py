@@ -0,0 +1,81 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.fleet.ingest import readings_ingested
+from apps.fleet.models import Robot, Site
+from apps.policies.models import MaintenancePolicy
+from maint_app.celery import publish
+from .models import WorkOrder
+from .scope import drop_scope_index, patch_scope_index
+from .conditions import evaluate_readings
+from .tasks import apply_usage_readings, evaluate_condition_readings
+from .usage import apply_readings, reset_usage
+
+log = logging.getLogger(__name__)
+
+
+# Index patches wait for the commit: a rolled-back save must not reach the index, and
+# other processes only see the change (through the DB version) once it is committed.
+@receiver(post_save, sender=MaintenancePolicy)
+def index_policy(sender, instance: MaintenancePolicy, created, **kwargs):
+    transaction.on_commit(lambda: patch_scope_index(instance, lambda index: index.add_policy(instance), created))
+
+
+@receiver(post_save, sender=Robot)
+def index_robot(sender, instance: Robot, created, **kwargs):
+    transaction.on_commit(lambda: patch_scope_index(instance, lambda index: index.add_robot(instance), created))
+
+
+@receiver(post_save, sender=Site)
+def index_site(sender, instance: Site, created, **kwargs):
+    transaction.on_commit(
+        lambda: patch_scope_index(instance, lambda index: index.update_site(instance.id, instance.name), created)
+    )
+
+
+@receiver(post_delete, sender=MaintenancePolicy)
+@receiver(post_delete, sender=Robot)
+@receiver(post_delete, sender=Site)
+def unindex(sender, instance, **kwargs):
+    transaction.on_commit(drop_scope_index)
+
+
+def _fold_inline(rows) -> None:
+    try:
+        apply_readings(rows)
+    except Exception:
+        log.exception("usage fold of %d readings failed; run `manage.py replay_usage` to recount", len(rows))
+
+
+@receiver(readings_ingested)
+def accumulate_usage(sender, rows, **kwargs):
+    # Folded by a worker outside the upload request, or here when there is no broker.
+    rows = list(rows)
+    payload = [(robot_id, counter, value, recorded_at.isoformat()) for robot_id, counter, value, recorded_at in rows]
+    transaction.on_commit(lambda: publish(apply_usage_readings, (payload,), fallback=lambda: _fold_inline(rows)))
+
+
+def _evaluate_inline(rows) -> None:
+    try:
+        evaluate_readings(rows)
+    except Exception:
+        log.exception("condition evaluation of %d readings failed", len(rows))
+
+
+@receiver(readings_ingested)
+def evaluate_conditions(sender, rows, **kwargs):
+    # On the single "conditions" worker, or here when there is no broker.
+    rows = list(rows)
+    payload = [(robot_id, counter, value, recorded_at.isoformat()) for robot_id, counter, value, recorded_at in rows]
+    transaction.on_commit(
+        lambda: publish(evaluate_condition_readings, (payload,), fallback=lambda: _evaluate_inline(rows))
+    )
+
+
+@receiver(post_save, sender=WorkOrder)
+def restart_usage_cycle(sender, instance: WorkOrder, **kwargs):
+    if instance.status in WorkOrder.CLOSED_STATUSES:
+        reset_usage(instance)
@@ -1,46 +1,102 @@
-from celery import shared_task
+from celery import shared_task, chord
+from django.db import DatabaseError
 from django.utils import timezone
-from dateutil.relativedelta import relativedelta
+from django.utils.dateparse import parse_datetime
 
-from apps.fleet.models import Robot
-from apps.policies.models import MaintenancePolicy
-from .models import WorkOrder
+from apps.fleet.models import Robot, Site
+from apps.notifications.models import NotificationLog, CHANNEL_SLACK
+from .conditions import evaluate_readings
+from .planner import plan_site, plan_incremental
+from .usage import apply_readings
+from .scope import robot_entry, scope_matches
+from .visits import consolidate_visits
+
+SUMMARY_CHANNEL = "#ops"
 
 
 def robot_matches_scope(robot: Robot, scope: dict) -> bool:
-    model_ok = scope.get("model") in (None, "*", robot.model)
-    site_ok = scope.get("site") in (None, "*", (robot.site.name if robot.site else None))
-    return model_ok and site_ok
+    # Single-pair check; the planner itself goes through ScopeIndex.
+    return scope_matches(robot_entry(robot, robot.site.name if robot.site else None), scope)
 
 
 @shared_task
 def generate_work_orders():
     """
     Daily: for each time-based policy, ensure an upcoming WorkOrder exists.
+    Fans out one shard task per site and aggregates them in summarize_planning.
+    """
+    now = timezone.now().isoformat()
+    site_ids = list(Site.objects.order_by("id").values_list("id", flat=True))
+    if not site_ids:
+        return summarize_planning([])
+
+    chord(plan_site_shard.s(site_id, now) for site_id in site_ids)(summarize_planning.s())
+    return {"shards": len(site_ids)}
+
+
+@shared_task(bind=True, autoretry_for=(DatabaseError,), retry_backoff=True, max_retries=5)
+def plan_site_shard(self, site_id: int, now: str = None):
+    """
+    Plan a single site's robots; safe to retry on its own.
+    """
+    return plan_site(site_id, now=parse_datetime(now) if now else None)
+
+
+@shared_task
+def summarize_planning(results):
+    """
+    Chord callback: add up the shard summaries and log one NotificationLog for the run.
+    """
+    total = {"shards": len(results), "pairs_evaluated": 0, "created": 0, "queries": 0}
+    for result in results:
+        for key in ("pairs_evaluated", "created", "queries"):
+            total[key] += result.get(key, 0)
+
+    NotificationLog.objects.create(
+        channel=CHANNEL_SLACK,
+        to=SUMMARY_CHANNEL,
+        subject="Work-order planning finished",
+        message=(
+            f"{total['created']} order(s) created from {total['pairs_evaluated']} robot/policy pairs "
+            f"across {total['shards']} site shard(s)."
+        ),
+        payload=total,
+    )
+    consolidate_visits_task.delay()
+    return total
+
+
+@shared_task
+def plan_work_orders_incremental():
+    """
+    Every few minutes: re-plan only robots, sites and policies changed since the last run,
+    plus pairs whose order was completed/cancelled or whose window just rolled over.
+    """
+    return plan_incremental()
+
+
+@shared_task(autoretry_for=(DatabaseError,), retry_backoff=True, max_retries=5)
+def apply_usage_readings(rows):
+    """
+    Fold one ingested batch of [robot_id, counter, value, recorded_at iso] into UsageState.
+    The fold is one transaction, so a retry after a database error does not double-count.
+    """
+    return apply_readings([(r, c, v, parse_datetime(ts)) for r, c, v, ts in rows])
+
+
+@shared_task
+def evaluate_condition_readings(rows):
+    """
+    Evaluate one ingested batch of [robot_id, counter, value, recorded_at iso] against the
+    condition policies and raise alerts. Runs on the single "conditions" worker, which
+    holds the excursion state; not retried, since the state has already moved on.
+    """
+    return evaluate_readings([(r, c, v, parse_datetime(ts)) for r, c, v, ts in rows])
+
+
+@shared_task
+def consolidate_visits_task(group_by: str = "site"):
+    """
+    After planning: fold overlapping open PM orders into visits (idempotent).
     """
-    now = timezone.now()
-
-    for pol in MaintenancePolicy.objects.all():
-        if pol.type != "time" or not pol.interval_days:
-            continue
-
-        for robot in Robot.objects.select_related("site").all():
-            if not robot_matches_scope(robot, pol.scope or {}):
-                continue
-
-            # Skip if one already scheduled within the window
-            window_start = now - relativedelta(days=pol.window_days or 0)
-            exists = WorkOrder.objects.filter(
-                robot=robot, policy=pol, status__in=["planned", "assigned"]
-            ).filter(due_by__gte=window_start).exists()
-            if exists:
-                continue
-
-            WorkOrder.objects.create(
-                robot=robot,
-                site=robot.site,
-                policy=pol,
-                type="PM",
-                priority=pol.priority or "P2",
-                due_by=now + relativedelta(days=+pol.interval_days),
-            )
+    return consolidate_visits(group_by=group_by)
@@ -0,0 +1,551 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from apps.fleet.ingest import ReadingIngestor
+from apps.fleet.models import CounterReading, Robot, Site
+from apps.policies.models import MaintenancePolicy
+from .conditions import ConditionEvaluator, Rule, compile_threshold
+from .forecast import build_forecast
+from .leveling import rebalance
+from .models import UsageState, Visit, WorkOrder
+from .planner import plan_incremental, plan_site, plan_work_orders
+from .scope import ScopeIndex, drop_scope_index, get_scope_index, scope_dict
+from .tasks import apply_usage_readings, evaluate_condition_readings, robot_matches_scope
+from .usage import apply_readings, replay_usage
+from .visits import consolidate_visits
+
+
+class ConsolidateWithCapacityTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now().replace(hour=9, minute=0, second=0, microsecond=0)
+        self.site = Site.objects.create(name="Excyte", daily_capacity=2)
+        policy = MaintenancePolicy.objects.create(name="pm", interval_days=30, window_days=10)
+        # Two orders a day over six days: already level, and every window overlaps day one.
+        for i in range(12):
+            robot = Robot.objects.create(model="Falcon28", serial=f"S{i}", site=self.site)
+            WorkOrder.objects.create(
+                robot=robot,
+                site=self.site,
+                policy=policy,
+                type="PM",
+                status="planned",
+                due_by=self.now + timedelta(days=1 + i // 2),
+            )
+
+    def loads(self) -> dict:
+        days = {}
+        for due_by in WorkOrder.objects.values_list("due_by", flat=True):
+            day = timezone.localdate(due_by)
+            days[day] = days.get(day, 0) + 1
+        return days
+
+    def test_visits_stay_within_capacity(self):
+        consolidate_visits(now=self.now)
+        self.assertLessEqual(max(self.loads().values()), 2)
+
+        self.assertEqual(rebalance(now=self.now)["moved"], 0)
+
+        before = list(WorkOrder.objects.order_by("id").values_list("id", "due_by", "visit_id"))
+        summary = consolidate_visits(now=self.now)
+        self.assertEqual(summary["visits_created"] + summary["visits_updated"] + summary["visits_removed"], 0)
+        self.assertEqual(list(WorkOrder.objects.order_by("id").values_list("id", "due_by", "visit_id")), before)
+
+    def test_room_lets_orders_join(self):
+        self.site.daily_capacity = 4
+        self.site.save()
+        consolidate_visits(now=self.now)
+        loads = self.loads()
+        self.assertLessEqual(max(loads.values()), 4)
+        self.assertLess(len(loads), 6)
+        self.assertEqual(rebalance(now=self.now)["moved"], 0)
+
+    def test_orders_leaving_a_visit_are_detached(self):
+        self.site.daily_capacity = 1
+        self.site.save()
+        MaintenancePolicy.objects.create(name="weekly", interval_days=7, window_days=5)
+        plan_work_orders(now=self.now)
+        consolidate_visits(now=self.now)
+        rebalance(now=self.now)
+        consolidate_visits(now=self.now)
+
+        for wo in WorkOrder.objects.filter(visit__isnull=False).select_related("visit"):
+            self.assertEqual(wo.due_by, wo.visit.due_by, wo.id)
+        self.assertFalse(Visit.objects.filter(work_orders__isnull=True).exists())
+
+
+class LevelingWindowTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now().replace(hour=9, minute=0, second=0, microsecond=0)
+        site = Site.objects.create(name="Excyte", daily_capacity=1)
+        MaintenancePolicy.objects.create(name="pm", interval_days=10, window_days=5)
+        for i in range(8):
+            Robot.objects.create(model="Falcon28", serial=f"S{i}", site=site)
+
+    def assertWithinWindows(self):
+        latest = self.now + timedelta(days=10)
+        for wo in WorkOrder.objects.all():
+            self.assertTrue(latest - timedelta(days=5) <= wo.due_by <= latest, (wo.id, wo.due_by))
+
+    def test_passes_never_leave_the_policy_window(self):
+        plan_work_orders(now=self.now)
+        nominal = set(WorkOrder.objects.values_list("nominal_due_by", flat=True))
+        self.assertEqual(nominal, {self.now + timedelta(days=10)})
+        self.assertWithinWindows()
+        for _ in range(3):
+            consolidate_visits(now=self.now)
+            self.assertWithinWindows()
+            rebalance(now=self.now)
+            self.assertWithinWindows()
+
+    def test_hand_edit_moves_the_nominal_date(self):
+        plan_work_orders(now=self.now)
+        WorkOrder.objects.update(last_reminder_days=3)
+        wo = WorkOrder.objects.first()
+        wo.due_by = self.now + timedelta(days=30)
+        wo.save()
+        wo.refresh_from_db()
+        self.assertEqual(wo.nominal_due_by, self.now + timedelta(days=30))
+        self.assertIsNone(wo.last_reminder_days)
+
+    def test_moved_orders_get_reminders_again(self):
+        plan_work_orders(now=self.now)
+        WorkOrder.objects.update(last_reminder_days=14)
+        before = dict(WorkOrder.objects.values_list("id", "due_by"))
+        consolidate_visits(now=self.now)
+        rebalance(now=self.now)
+
+        moved = 0
+        for wo_id, due_by, marker in WorkOrder.objects.values_list("id", "due_by", "last_reminder_days"):
+            if due_by != before[wo_id]:
+                moved += 1
+                self.assertIsNone(marker, wo_id)
+            else:
+                self.assertEqual(marker, 14, wo_id)
+        self.assertTrue(moved)
+
+
+@override_settings(TASKS_INLINE=True)
+class UsageIngestTests(TestCase):
+    def test_upload_is_folded_without_a_broker(self):
+        site = Site.objects.create(name="Excyte")
+        robot = Robot.objects.create(model="Falcon28", serial="U-1", site=site)
+        MaintenancePolicy.objects.create(name="hours", type="usage", counter="hours", interval_units=10)
+        lines = [
+            '{"serial": "U-1", "counter": "hours", "value": 6, "timestamp": "2026-10-01T10:00:00Z"}',
+            '{"serial": "U-1", "counter": "hours", "value": 5, "timestamp": "2026-10-01T11:00:00Z"}',
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            summary = ReadingIngestor().feed(lines).close()
+
+        self.assertEqual(summary["accepted"], 2)
+        self.assertEqual(UsageState.objects.get(robot=robot).total, 11)
+        self.assertTrue(WorkOrder.objects.filter(robot=robot, type="PM").exists())
+
+
+class UsageEngineTests(TestCase):
+    def setUp(self):
+        drop_scope_index()
+        self.t0 = timezone.now().replace(microsecond=0) - timedelta(days=2)
+        site = Site.objects.create(name="Excyte")
+        self.robot = Robot.objects.create(model="Falcon28", serial="UE-1", site=site)
+        self.other = Robot.objects.create(model="Hawk9", serial="UE-2", site=site)
+        self.policy = MaintenancePolicy.objects.create(
+            name="hours", type="usage", counter="hours", interval_units=10, scope={"model": "Falcon28"}
+        )
+
+    def at(self, hours: float):
+        return self.t0 + timedelta(hours=hours)
+
+    def feed(self, *readings, robot=None):
+        """
+        Store and fold one batch of (hours offset, value) "hours" readings.
+        """
+        robot = robot or self.robot
+        rows = [(robot.id, "hours", float(value), self.at(h)) for h, value in readings]
+        CounterReading.objects.bulk_create(
+            CounterReading(robot_id=r, counter=c, value=v, recorded_at=ts) for r, c, v, ts in rows
+        )
+        return apply_readings(rows, now=self.at(max(h for h, _ in readings)))
+
+    def state(self):
+        return UsageState.objects.get(robot=self.robot, policy=self.policy)
+
+    def orders(self):
+        return WorkOrder.objects.filter(robot=self.robot, policy=self.policy)
+
+    def complete(self, hours: float):
+        wo = self.orders().get(status="planned")
+        wo.status, wo.completed_at = "completed", self.at(hours)
+        wo.save()
+
+    def test_crossing_the_interval_raises_one_order(self):
+        self.feed((1, 4), (2, 5))
+        self.assertEqual(self.state().total, 9)
+        self.assertFalse(self.orders().exists())
+
+        self.assertEqual(self.feed((3, 1))["orders_created"], 1)
+        self.assertTrue(self.state().triggered)
+        self.assertEqual(self.feed((4, 20))["orders_created"], 0)
+        self.assertEqual(self.orders().count(), 1)
+        self.assertEqual(self.state().total, 30)
+
+    def test_out_of_scope_robots_are_not_counted(self):
+        self.feed((1, 50), robot=self.other)
+        self.assertFalse(UsageState.objects.exists())
+        self.assertFalse(WorkOrder.objects.exists())
+
+    def test_completion_starts_a_new_cycle(self):
+        self.feed((1, 12))
+        self.complete(5)
+        state = self.state()
+        self.assertEqual((state.total, state.since, state.triggered), (0, self.at(5), False))
+
+        self.feed((6, 9))
+        self.assertFalse(self.orders().filter(status="planned").exists())
+        self.feed((7, 1))
+        self.assertEqual(self.orders().filter(status="planned").count(), 1)
+
+    def test_readings_before_the_last_completion_do_not_count(self):
+        self.feed((1, 12))
+        self.complete(5)
+        # A late upload straddling the completion: only what follows it counts.
+        self.feed((2, 7), (4, 2), (6, 3))
+        self.assertEqual(self.state().total, 3)
+        # A batch wholly before it changes nothing.
+        self.feed((3, 100))
+        self.assertEqual(self.state().total, 3)
+        self.assertFalse(self.orders().filter(status="planned").exists())
+
+    def test_replay_matches_the_incremental_totals(self):
+        self.feed((1, 6), (2, 3))
+        self.feed((3, 4))
+        self.complete(4)
+        self.feed((3.5, 8), (5, 2))
+        self.feed((6, 5))
+        self.feed((7, 40), robot=self.other)
+        incremental = list(UsageState.objects.values_list("robot_id", "policy_id", "total", "since", "triggered"))
+        orders = self.orders().count()
+
+        summary = replay_usage(now=self.at(8))
+        self.assertEqual(summary["orders_created"], 0)
+        self.assertEqual(
+            list(UsageState.objects.values_list("robot_id", "policy_id", "total", "since", "triggered")),
+            incremental,
+        )
+        self.assertEqual(self.orders().count(), orders)
+        self.assertEqual(incremental[0][2], 7)
+
+
+class ConditionIngestTests(TestCase):
+    lines = ['{"serial": "C-1", "counter": "temp_motor", "value": 91, "timestamp": "2026-10-01T10:00:00Z"}']
+
+    def setUp(self):
+        site = Site.objects.create(name="Excyte")
+        self.robot = Robot.objects.create(model="Falcon28", serial="C-1", site=site)
+        MaintenancePolicy.objects.create(name="hot", type="condition", threshold={"temp_motor": {">": 85}})
+
+    @override_settings(TASKS_INLINE=True)
+    def test_evaluated_after_commit_without_a_broker(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            ReadingIngestor().feed(self.lines).close()
+        self.assertFalse(WorkOrder.objects.filter(robot=self.robot, type="CM").exists())
+        for callback in callbacks:
+            callback()
+        self.assertTrue(WorkOrder.objects.filter(robot=self.robot, type="CM").exists())
+
+    @override_settings(TASKS_INLINE=False)
+    def test_upload_only_queues_the_batch(self):
+        with mock.patch.object(evaluate_condition_readings, "apply_async") as evaluate, \
+                mock.patch.object(apply_usage_readings, "apply_async"):
+            with self.captureOnCommitCallbacks(execute=True):
+                ReadingIngestor().feed(self.lines).close()
+        evaluate.assert_called_once()
+        (rows,) = evaluate.call_args.args[0]
+        self.assertEqual(rows, [(self.robot.id, "temp_motor", 91.0, "2026-10-01T10:00:00+00:00")])
+        self.assertFalse(WorkOrder.objects.filter(robot=self.robot, type="CM").exists())
+
+
+class ConditionEvaluatorTests(SimpleTestCase):
+    def fire_times(self, rule, values, start=0, step=60):
+        """
+        Feed one sample per `step` seconds, one per batch; return when the rule fired.
+        """
+        evaluator = ConditionEvaluator([rule])
+        fired = []
+        for i, value in enumerate(values):
+            ts = start + i * step
+            fired += [t for _, _, _, t in evaluator.evaluate([(1, rule.metric, value, ts)])]
+        return fired
+
+    def test_thresholds_compile(self):
+        (rule,) = compile_threshold(7, {"temp_motor": {">": 85, "for": "5m", "max_gap": "2m"}})
+        self.assertEqual((rule.policy_id, rule.symbol, rule.limit, rule.duration, rule.max_gap), (7, ">", 85, 300, 120))
+        (bare,) = compile_threshold(7, {"battery": "80", "bad": {">": "x"}})
+        self.assertEqual((bare.metric, bare.symbol, bare.limit, bare.duration), ("battery", ">", 80, 0))
+
+    def test_fires_once_per_excursion(self):
+        rule = Rule(1, "temp_motor", ">", 85, duration=300)
+        # Hot from t=60 to t=840, cool at t=900, hot again from t=960.
+        values = [80] + [90] * 14 + [80] + [90] * 8
+        self.assertEqual(self.fire_times(rule, values), [360, 1260])
+
+    def test_fires_immediately_without_a_duration(self):
+        rule = Rule(1, "temp_motor", ">", 85)
+        self.assertEqual(self.fire_times(rule, [90, 90, 80, 90]), [0, 180])
+
+    def test_short_excursions_do_not_fire(self):
+        rule = Rule(1, "temp_motor", ">", 85, duration=300)
+        self.assertEqual(self.fire_times(rule, [90, 90, 90, 80] * 5), [])
+
+    def test_a_gap_restarts_the_window(self):
+        rule = Rule(1, "temp_motor", ">", 85, duration=600, max_gap=120)
+        evaluator = ConditionEvaluator([rule])
+        for ts in (0, 60, 120):
+            self.assertEqual(evaluator.evaluate([(1, "temp_motor", 90, ts)]), [])
+        # Silent for four minutes: the excursion is counted again from t=360.
+        fired = [t for ts in range(360, 1200, 60) for _, _, _, t in evaluator.evaluate([(1, "temp_motor", 90, ts)])]
+        self.assertEqual(fired, [960])
+        # Still hot after another gap: the same excursion, no second alert.
+        self.assertEqual(evaluator.evaluate([(1, "temp_motor", 90, 1500)]), [])
+
+    def test_batches_are_ordered_and_robots_kept_apart(self):
+        rule = Rule(1, "temp_motor", ">", 85, duration=120)
+        evaluator = ConditionEvaluator([rule], policies_for_robot=lambda robot_id: {1} if robot_id != 3 else set())
+        batch = [(robot, "temp_motor", 90, ts) for ts in (180, 0, 120, 60) for robot in (1, 2, 3)]
+        batch.append((2, "temp_motor", 80, 90))
+        fired = sorted((robot, ts) for robot, _, _, ts in evaluator.evaluate(batch))
+        self.assertEqual(fired, [(1, 120)])
+
+
+class ForecastTests(TestCase):
+    def test_each_robot_is_covered_only_by_its_own_orders(self):
+        now = timezone.now().replace(hour=9, minute=0, second=0, microsecond=0)
+        site = Site.objects.create(name="Excyte")
+        policy = MaintenancePolicy.objects.create(name="pm", interval_days=30, window_days=10)
+        a = Robot.objects.create(model="Falcon28", serial="F-A", site=site)
+        b = Robot.objects.create(model="Falcon28", serial="F-B", site=site)
+        # Two open orders for `a` (a rolled-over pair), none yet for `b`.
+        for days in (5, 20):
+            WorkOrder.objects.create(robot=a, site=site, policy=policy, due_by=now + timedelta(days=days))
+        before = build_forecast(now=now)
+
+        # What the planner would create for `b` today is already in the projection.
+        WorkOrder.objects.create(robot=b, site=site, policy=policy, due_by=now + timedelta(days=30))
+        self.assertEqual(build_forecast(now=now)["buckets"], before["buckets"])
+
+
+class PlannerFleetMixin:
+    """
+    A mixed fleet: two sites, a robot without one, and policies scoped by string, list,
+    wildcard and environment, plus a scope stored as a list (treated as unrestricted).
+    """
+
+    def setUp(self):
+        drop_scope_index()
+        self.now = timezone.now().replace(microsecond=0)
+        self.excyte = Site.objects.create(name="Excyte")
+        self.lumen = Site.objects.create(name="Lumen")
+        self.robots = {
+            serial: Robot.objects.create(serial=serial, model=model, tier=tier, environments=envs, site=site)
+            for serial, model, tier, envs, site in (
+                ("P-1", "Falcon28", "P1", ["dusty"], self.excyte),
+                ("P-2", "Falcon28", "P2", {"dusty": False, "wet": True}, self.excyte),
+                ("P-3", "Hawk9", "P1", [], self.lumen),
+                ("P-4", "Hawk9", "P2", {"dusty": True}, self.lumen),
+                ("P-5", "Owl3", "P1", None, self.lumen),
+                ("P-6", "Falcon28", "P1", ["dusty"], None),
+            )
+        }
+        self.policies = {
+            name: MaintenancePolicy.objects.create(name=name, interval_days=30, window_days=10, **fields)
+            for name, fields in (
+                ("all", {"scope": {}}),
+                ("listed", {"scope": ["model"]}),
+                ("excyte", {"scope": {"model": "*", "site": "Excyte"}}),
+                ("p1-birds", {"scope": {"model": ["Falcon28", "Hawk9"], "tier": "P1"}}),
+                ("dusty", {"scope": {"environment": "dusty"}}),
+                ("north", {"scope": {"site": "North"}}),
+                ("none-yet", {"scope": {"model": "Kite"}}),
+                ("usage", {"scope": {}, "type": "usage", "counter": "hours", "interval_units": 10}),
+            )
+        }
+        self.policies["no-interval"] = MaintenancePolicy.objects.create(name="no-interval", interval_days=None)
+
+    def pairs(self, orders=None) -> set:
+        orders = WorkOrder.objects.all() if orders is None else orders
+        return set(orders.values_list("robot_id", "policy_id"))
+
+
+class PlannerTests(PlannerFleetMixin, TestCase):
+    def reference_pairs(self) -> set:
+        """
+        The per-pair loop the planner replaced: one scope check and one query per pair.
+        Robots without a site are skipped (WorkOrder.site is required).
+        """
+        pairs = set()
+        for pol in MaintenancePolicy.objects.filter(type="time", interval_days__gt=0):
+            window_start = self.now - timedelta(days=pol.window_days or 0)
+            for robot in Robot.objects.select_related("site"):
+                if robot.site_id is None or not robot_matches_scope(robot, scope_dict(pol)):
+                    continue
+                if not WorkOrder.objects.filter(
+                    robot=robot, policy=pol, status__in=WorkOrder.OPEN_STATUSES, due_by__gte=window_start
+                ).exists():
+                    pairs.add((robot.id, pol.id))
+        return pairs
+
+    def test_matches_the_per_pair_planner(self):
+        p1, p3 = self.robots["P-1"], self.robots["P-3"]
+        everyone = self.policies["all"]
+        for robot, status, days in (
+            (p1, "in_progress", -5),   # started, still inside the window: covers the pair
+            (p3, "planned", -20),      # rolled out of the window: does not
+            (p3, "completed", 20),     # closed: does not
+        ):
+            WorkOrder.objects.create(
+                robot=robot, site=robot.site, policy=everyone, status=status, due_by=self.now + timedelta(days=days)
+            )
+        expected = self.reference_pairs()
+        self.assertNotIn((p1.id, everyone.id), expected)
+        self.assertIn((p3.id, everyone.id), expected)
+        self.assertFalse({pair for pair in expected if pair[0] == self.robots["P-6"].id})
+
+        existing = set(WorkOrder.objects.values_list("id", flat=True))
+        summary = plan_work_orders(now=self.now)
+        created = WorkOrder.objects.exclude(id__in=existing)
+
+        self.assertEqual(self.pairs(created), expected)
+        self.assertEqual(summary["created"], len(expected))
+        self.assertEqual(set(created.values_list("due_by", flat=True)), {self.now + timedelta(days=30)})
+        self.assertEqual(plan_work_orders(now=self.now)["created"], 0)
+
+    def test_site_shards_plan_the_whole_fleet(self):
+        expected = self.reference_pairs()
+        for site in (self.excyte, self.lumen):
+            plan_site(site.id, now=self.now)
+        self.assertEqual(self.pairs(), expected)
+        self.assertEqual(plan_site(self.lumen.id, now=self.now)["created"], 0)
+
+    def plan_fleet(self):
+        # Age the fleet past CHANGE_LAG so the next run sees only the edit made after this.
+        for model in (Site, Robot, MaintenancePolicy):
+            model.objects.update(updated_at=self.now - timedelta(days=1))
+        plan_incremental()
+
+    def test_incremental_picks_up_robot_edits(self):
+        self.plan_fleet()
+        before = self.pairs()
+        robot = self.robots["P-4"]
+        robot.tier = "P1"
+        robot.save()
+
+        plan_incremental()
+        self.assertEqual(self.pairs() - before, {(robot.id, self.policies["p1-birds"].id)})
+
+    def test_incremental_picks_up_site_edits(self):
+        self.plan_fleet()
+        before = self.pairs()
+        self.lumen.name = "North"
+        self.lumen.save()
+
+        plan_incremental()
+        north = self.policies["north"].id
+        self.assertEqual(
+            self.pairs() - before,
+            {(self.robots[serial].id, north) for serial in ("P-3", "P-4", "P-5")},
+        )
+
+    def test_incremental_picks_up_policy_edits(self):
+        self.plan_fleet()
+        before = self.pairs()
+        policy = self.policies["none-yet"]
+        policy.scope = {"model": "Owl3"}
+        policy.save()
+
+        plan_incremental()
+        self.assertEqual(self.pairs() - before, {(self.robots["P-5"].id, policy.id)})
+
+
+class ScopeIndexTests(PlannerFleetMixin, TestCase):
+    def assertIndexCurrent(self, index):
+        """
+        `index` answers like a fresh build, and both agree with the per-pair scope check.
+        """
+        fresh = ScopeIndex.build()
+        self.assertEqual(set(index.policies), set(fresh.policies))
+        self.assertEqual(set(index.robots), set(fresh.robots))
+        for policy in MaintenancePolicy.objects.all():
+            expected = {
+                robot.id for robot in Robot.objects.select_related("site")
+                if robot_matches_scope(robot, scope_dict(policy))
+            }
+            self.assertEqual(index.robots_for_policy(policy.id), expected, policy.name)
+            self.assertEqual(fresh.robots_for_policy(policy.id), expected, policy.name)
+        for robot_id in fresh.robots:
+            self.assertEqual(index.policies_for_robot(robot_id), fresh.policies_for_robot(robot_id), robot_id)
+            self.assertEqual(index.robots[robot_id], fresh.robots[robot_id])
+
+    def test_saves_are_patched_in_place(self):
+        index = get_scope_index()
+        self.assertIndexCurrent(index)
+        with self.captureOnCommitCallbacks(execute=True):
+            robot = self.robots["P-2"]
+            robot.tier, robot.environments = "P1", ["dusty"]
+            robot.save()
+            moved = self.robots["P-6"]
+            moved.site = self.excyte
+            moved.save()
+            Robot.objects.create(serial="P-7", model="Hawk9", tier="P1", site=self.lumen)
+            policy = self.policies["none-yet"]
+            policy.scope = {"model": ["Owl3", "Hawk9"], "site": "Lumen"}
+            policy.save()
+            MaintenancePolicy.objects.create(name="wet", interval_days=30, scope={"environment": ["wet", "*"]})
+
+        self.assertIs(get_scope_index(), index)
+        self.assertIndexCurrent(index)
+
+    def test_site_rename_rekeys_its_robots(self):
+        index = get_scope_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lumen.name = "North"
+            self.lumen.save()
+            self.excyte.name = "Excyte"  # saved unchanged
+            self.excyte.save()
+
+        self.assertIs(get_scope_index(), index)
+        self.assertIndexCurrent(index)
+        self.assertEqual(
+            index.robots_for_policy(self.policies["north"].id),
+            {self.robots[serial].id for serial in ("P-3", "P-4", "P-5")},
+        )
+
+    def test_deletes_rebuild_the_index(self):
+        index = get_scope_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.robots["P-6"].delete()
+            self.policies["dusty"].delete()
+        rebuilt = get_scope_index()
+        self.assertIsNot(rebuilt, index)
+        self.assertIndexCurrent(rebuilt)
+
+        lumen_id = self.lumen.id
+        with self.captureOnCommitCallbacks(execute=True):
+            for serial in ("P-3", "P-4", "P-5"):
+                self.robots[serial].delete()
+            self.lumen.delete()
+        self.assertIsNot(get_scope_index(), rebuilt)
+        self.assertIndexCurrent(get_scope_index())
+        self.assertNotIn(lumen_id, get_scope_index().site_names)
+
+    def test_changes_without_a_patch_rebuild_the_index(self):
+        index = get_scope_index()
+        # No on_commit callback runs here, as for a save made by another process.
+        robot = self.robots["P-5"]
+        robot.model = "Hawk9"
+        robot.save()
+        rebuilt = get_scope_index()
+        self.assertIsNot(rebuilt, index)
+        self.assertIndexCurrent(rebuilt)
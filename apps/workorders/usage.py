@@ -0,0 +1,276 @@
+"""
+Usage-based trigger engine for MaintenancePolicy(type="usage").
+
+Counter readings are treated as increments (e.g. hours run since the previous report).
+For every (robot, usage policy) pair a UsageState row keeps the running total since the
+pair's last completed WorkOrder; when it reaches `interval_units` a PM order is raised.
+
+Uploads fold their batch after commit: on a worker (tasks.apply_usage_readings), or in the
+uploading process when there is no broker or the task cannot be published. A batch whose
+fold never ran (worker lost, fold failed) is stored but not counted; `manage.py
+replay_usage` rebuilds the totals from the stored readings.
+"""
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from dateutil.relativedelta import relativedelta
+
+from apps.fleet.models import CounterReading
+from .models import WorkOrder, UsageState
+from .scope import get_scope_index
+
+BATCH_SIZE = 2000
+
+
+def _usage_policies(index) -> dict:
+    """
+    counter -> {policy_id: policy} for active usage policies.
+    """
+    by_counter = defaultdict(dict)
+    for pol in index.policies.values():
+        if pol.type == "usage" and pol.counter and pol.interval_units and pol.interval_units > 0:
+            by_counter[pol.counter][pol.id] = pol
+    return by_counter
+
+
+def _last_completions(robot_ids, policy_ids) -> dict:
+    """
+    (robot_id, policy_id) -> latest completed_at, in one grouped query.
+    """
+    return {
+        (row["robot_id"], row["policy_id"]): row["last_done"]
+        for row in WorkOrder.objects.filter(
+            status="completed", robot_id__in=robot_ids, policy_id__in=policy_ids
+        ).values("robot_id", "policy_id").annotate(last_done=Max("completed_at"))
+    }
+
+
+def _raise_orders(states: Iterable[UsageState], policies: dict, now) -> int:
+    """
+    Create one PM order per state that crossed its interval and has no open order yet.
+    Marks the states as triggered; the caller persists them.
+    """
+    due = [s for s in states if not s.triggered and s.total >= policies[s.policy_id].interval_units]
+    if not due:
+        return 0
+
+    open_pairs = set(
+        WorkOrder.objects.filter(
+            status__in=WorkOrder.OPEN_STATUSES,
+            robot_id__in={s.robot_id for s in due},
+            policy_id__in={s.policy_id for s in due},
+        ).values_list("robot_id", "policy_id")
+    )
+    index = get_scope_index()
+
+    orders = []
+    for state in due:
+        state.triggered = True
+        robot = index.robots.get(state.robot_id)
+        if (state.robot_id, state.policy_id) in open_pairs or not robot or robot["site_id"] is None:
+            continue
+        pol = policies[state.policy_id]
+        due_by = now + relativedelta(days=+(pol.window_days or 0))
+        orders.append(
+            WorkOrder(
+                robot_id=state.robot_id,
+                site_id=robot["site_id"],
+                policy_id=pol.id,
+                type="PM",
+                priority=pol.priority or "P2",
+                due_by=due_by,
+                nominal_due_by=due_by,
+                notes=f"Usage trigger: {state.total:g} {pol.counter} (interval {pol.interval_units})",
+            )
+        )
+    WorkOrder.objects.bulk_create(orders, batch_size=BATCH_SIZE)
+    return len(orders)
+
+
+def _save_states(states: list) -> None:
+    """
+    Persist total/triggered/updated_at with one executemany; bulk_update's CASE
+    expressions get slow past a few thousand rows.
+    """
+    if not states:
+        return
+    table = connection.ops.quote_name(UsageState._meta.db_table)
+    adapt = connection.ops.adapt_datetimefield_value
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"UPDATE {table} SET total = %s, triggered = %s, updated_at = %s WHERE id = %s",
+            [(s.total, s.triggered, adapt(s.updated_at), s.id) for s in states],
+        )
+
+
+def apply_readings(rows: Iterable[tuple], now=None) -> dict:
+    """
+    Fold a batch of (robot_id, counter, value, recorded_at) readings into UsageState.
+
+    Readings are summed per (robot, counter) first, so the database work is a few
+    queries per batch regardless of how many readings it holds.
+    """
+    now = now or timezone.now()
+    index = get_scope_index()
+    by_counter = _usage_policies(index)
+    summary = {"pairs_updated": 0, "orders_created": 0}
+    if not by_counter:
+        return summary
+
+    # (robot_id, counter) -> [sum, earliest reading, [(ts, value), ...]]
+    sums = {}
+    for robot_id, counter, value, recorded_at in rows:
+        if counter not in by_counter:
+            continue
+        acc = sums.get((robot_id, counter))
+        if acc is None:
+            sums[(robot_id, counter)] = [value, recorded_at, [(recorded_at, value)]]
+        else:
+            acc[0] += value
+            acc[1] = min(acc[1], recorded_at)
+            acc[2].append((recorded_at, value))
+    if not sums:
+        return summary
+
+    # (robot_id, policy_id) -> (robot_id, counter) key feeding it
+    feeds = {}
+    for robot_id, counter in sums:
+        matching = index.policies_for_robot(robot_id)
+        for policy_id in matching & by_counter[counter].keys():
+            feeds[(robot_id, policy_id)] = (robot_id, counter)
+    if not feeds:
+        return summary
+
+    policies = {pid: pol for pols in by_counter.values() for pid, pol in pols.items()}
+    robot_ids = {r for r, _ in feeds}
+    policy_ids = {p for _, p in feeds}
+
+    with transaction.atomic():
+        states = {
+            (s.robot_id, s.policy_id): s
+            # Locks are taken in id order so concurrent folds cannot deadlock.
+            for s in UsageState.objects.select_for_update().filter(
+                robot_id__in=robot_ids, policy_id__in=policy_ids
+            ).order_by("id")
+        }
+        missing = [pair for pair in feeds if pair not in states]
+        if missing:
+            done = _last_completions({r for r, _ in missing}, {p for _, p in missing})
+            new_states = [UsageState(robot_id=r, policy_id=p, since=done.get((r, p))) for r, p in missing]
+            UsageState.objects.bulk_create(new_states, batch_size=BATCH_SIZE, ignore_conflicts=True)
+            states.update(
+                ((s.robot_id, s.policy_id), s)
+                for s in UsageState.objects.select_for_update().filter(
+                    robot_id__in={r for r, _ in missing}, policy_id__in={p for _, p in missing}
+                ).order_by("id")
+            )
+
+        touched = []
+        for pair, key in feeds.items():
+            state = states.get(pair)
+            if state is None:
+                continue
+            delta, earliest, samples = sums[key]
+            if state.since is not None and earliest <= state.since:
+                # Part of the batch predates the last completion; count only what follows it.
+                delta = sum(v for ts, v in samples if ts > state.since)
+            if not delta:
+                continue
+            state.total += delta
+            state.updated_at = now
+            touched.append(state)
+
+        summary["orders_created"] = _raise_orders(touched, policies, now)
+        _save_states(touched)
+        summary["pairs_updated"] = len(touched)
+
+    return summary
+
+
+def reset_usage(work_order: WorkOrder) -> None:
+    """
+    Start a new cycle for the order's pair once it is completed (or let it re-trigger
+    when cancelled). Called from the WorkOrder post_save handler.
+    """
+    if not work_order.policy_id:
+        return
+    pair = UsageState.objects.filter(robot_id=work_order.robot_id, policy_id=work_order.policy_id)
+    if work_order.status == "completed":
+        done_at = work_order.completed_at or work_order.updated_at or timezone.now()
+        # Re-saving an already-counted completion must not wipe usage accrued since.
+        pair.exclude(since__gte=done_at).update(total=0, since=done_at, triggered=False)
+    elif work_order.status == "cancelled":
+        pair.update(triggered=False)
+
+
+def replay_usage(policy_ids: Optional[Iterable[int]] = None, now=None, chunk_size: int = 10000) -> dict:
+    """
+    Rebuild UsageState from stored CounterReading rows, then raise any orders that are due.
+
+    Readings are streamed once in chunks; memory grows with the number of pairs,
+    not the number of readings.
+    """
+    now = now or timezone.now()
+    index = get_scope_index()
+    by_counter = _usage_policies(index)
+    if policy_ids is not None:
+        wanted = set(policy_ids)
+        by_counter = {
+            c: {pid: p for pid, p in pols.items() if pid in wanted} for c, pols in by_counter.items()
+        }
+        by_counter = {c: pols for c, pols in by_counter.items() if pols}
+    policies = {pid: pol for pols in by_counter.values() for pid, pol in pols.items()}
+    summary = {"readings": 0, "pairs": 0, "orders_created": 0}
+    if not policies:
+        return summary
+
+    # (robot_id, policy_id) -> last completion, for every pair in scope
+    robots_by_policy = {pid: index.robots_for_policy(pid) for pid in policies}
+    done = _last_completions(set().union(*robots_by_policy.values()), set(policies))
+    totals = {}
+    since = {}
+    for pid, robot_ids in robots_by_policy.items():
+        for robot_id in robot_ids:
+            totals[(robot_id, pid)] = 0.0
+            since[(robot_id, pid)] = done.get((robot_id, pid))
+
+    # (robot_id, counter) -> policy ids, memoised as readings stream past
+    routes = {}
+    readings = CounterReading.objects.filter(counter__in=list(by_counter)).values_list(
+        "robot_id", "counter", "value", "recorded_at"
+    )
+    for robot_id, counter, value, recorded_at in readings.iterator(chunk_size=chunk_size):
+        summary["readings"] += 1
+        key = (robot_id, counter)
+        targets = routes.get(key)
+        if targets is None:
+            targets = routes[key] = [
+                pid for pid in by_counter[counter] if robot_id in robots_by_policy[pid]
+            ]
+        for pid in targets:
+            pair = (robot_id, pid)
+            cutoff = since[pair]
+            if cutoff is None or recorded_at > cutoff:
+                totals[pair] += value
+
+    open_pairs = set(
+        WorkOrder.objects.filter(status__in=WorkOrder.OPEN_STATUSES, policy_id__in=list(policies))
+        .values_list("robot_id", "policy_id")
+    )
+    states = [
+        UsageState(
+            robot_id=r, policy_id=p, total=total, since=since[(r, p)],
+            triggered=(r, p) in open_pairs, updated_at=now,
+        )
+        for (r, p), total in totals.items()
+    ]
+
+    with transaction.atomic():
+        UsageState.objects.filter(policy_id__in=list(policies)).delete()
+        summary["orders_created"] = _raise_orders(states, policies, now)
+        UsageState.objects.bulk_create(states, batch_size=BATCH_SIZE)
+    summary["pairs"] = len(states)
+    return summary
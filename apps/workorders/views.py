@@ -1,4 +1,8 @@
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .forecast import get_forecast
 from .models import WorkOrder
 from .serializers import WorkOrderSerializer
 
@@ -9,3 +13,16 @@ class WorkOrderViewSet(viewsets.ModelViewSet):
     """
     queryset = WorkOrder.objects.all().select_related("robot", "site", "assigned_to", "completed_by", "policy")
     serializer_class = WorkOrderSerializer
+    cursor_ordering = ("due_by", "id")
+
+    @action(detail=False, methods=["get"])
+    def forecast(self, request):
+        """
+        Projected PM orders per week/site/priority; nothing is written.
+        GET /api/workorders/workorders/forecast/?months=6   (1–12, default 3)
+        """
+        try:
+            months = int(request.query_params.get("months", 3))
+        except ValueError:
+            months = 3
+        return Response(get_forecast(months))
@@ -0,0 +1,184 @@
+"""
+Visit consolidation: fold open PM orders whose windows overlap into one Visit.
+
+An order can be done anywhere in [nominal_due_by - window_days, nominal_due_by] (see
+WorkOrder.due_window); an existing visit in
+[window_start, window_end]. Per site (or per robot), items are swept in order of window
+end and each group is stabbed at the earliest end, taking every remaining item whose
+window has opened by then. That gives the fewest visits, and because every later group
+starts after the previous stab point, re-running over the result changes nothing.
+
+Members are re-dated to the visit day, so at sites with a daily capacity an item only joins
+while that day has room (see leveling.CapacityCalendar). Consolidation therefore never
+pushes a day over capacity, and leveling's rebalance() has nothing to undo.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .leveling import CapacityCalendar
+from .models import Visit, WorkOrder
+
+GROUP_BY = ("site", "robot")
+
+
+def _items(orders: list) -> list:
+    """
+    Collapse orders into sweep items: one per existing visit, one per loose order.
+    Each item is (window_start, window_end, visit_id or None, [orders]).
+    Members moved off their visit's date (e.g. by leveling) count as loose again.
+    """
+    visits = {}
+    loose = []
+    for wo in orders:
+        if wo.visit_id is None or wo.due_by != wo.visit.due_by:
+            earliest, latest = wo.due_window()
+            loose.append((earliest, latest, None, [wo]))
+            continue
+        item = visits.get(wo.visit_id)
+        if item is None:
+            item = visits[wo.visit_id] = (wo.visit.window_start, wo.visit.window_end, wo.visit_id, [])
+        item[3].append(wo)
+    return list(visits.values()) + loose
+
+
+def _sweep(items: list, admit=None) -> list:
+    """
+    Greedy interval stabbing. Returns [(window_start, stab point, [items]), ...].
+    `admit(point, item)` may refuse an overlapping item (which then waits for a later
+    group); the item that sets the stab point is always taken.
+    """
+    items.sort(key=lambda it: (it[1], it[0]))
+    groups = []
+    i = 0
+    while i < len(items):
+        point = items[i][1]
+        start = items[i][0]
+        group = []
+        rest = []
+        for item in items[i:]:
+            if item[0] <= point and (not group or admit is None or admit(point, item)):
+                group.append(item)
+                start = max(start, item[0])
+            else:
+                rest.append(item)
+        groups.append((start, point, group))
+        items[i:] = rest
+    return groups
+
+
+def consolidate_visits(group_by: str = "site", site_ids=None, dry_run: bool = False, now=None) -> dict:
+    """
+    Group open PM orders into visits and align their due_by on the visit date.
+
+    `group_by="site"` merges orders for any robots at the same site; "robot" only merges
+    orders for the same robot. Orders that overlap nothing stay without a visit.
+    """
+    if group_by not in GROUP_BY:
+        raise ValueError(f"group_by must be one of {GROUP_BY}")
+    now = now or timezone.now()
+
+    orders = WorkOrder.objects.filter(
+        type="PM", status__in=WorkOrder.NOT_STARTED_STATUSES, due_by__gte=now
+    ).select_related("policy", "visit")
+    if site_ids is not None:
+        orders = orders.filter(site_id__in=site_ids)
+
+    buckets = defaultdict(list)
+    for wo in orders:
+        buckets[wo.site_id if group_by == "site" else (wo.site_id, wo.robot_id)].append(wo)
+
+    today = timezone.localdate(now)
+    orders = [wo for bucket in buckets.values() for wo in bucket]
+    last = max((timezone.localdate(wo.due_by) for wo in orders), default=today)
+    calendar = CapacityCalendar.load_for({wo.site_id for wo in orders}, today, (last - today).days + 1)
+
+    def admit(point, item) -> bool:
+        # Join only if the visit day has room for the members that would move onto it.
+        site_id = item[3][0].site_id
+        day = timezone.localdate(point)
+        moving = [wo for wo in item[3] if timezone.localdate(wo.due_by) != day]
+        room = calendar.room(site_id, day)
+        if room is not None and len(moving) > room:
+            return False
+        for wo in moving:
+            calendar.move(site_id, timezone.localdate(wo.due_by), day)
+        return True
+
+    summary = {
+        "dry_run": dry_run, "orders": 0, "orders_detached": 0,
+        "visits_created": 0, "visits_updated": 0, "visits_removed": 0,
+    }
+    new_visits = []      # (Visit, [orders])
+    changed_visits = []  # (Visit, [orders])
+    kept = set()         # visit ids that still have a group after this run
+    grouped = set()      # order ids placed in a visit by this run
+
+    for bucket in buckets.values():
+        for start, point, group in _sweep(_items(bucket), admit):
+            members = [wo for item in group for wo in item[3]]
+            visit_ids = sorted(item[2] for item in group if item[2] is not None)
+            if len(members) < 2 and not visit_ids:
+                continue
+            grouped.update(wo.id for wo in members)
+
+            robots = {wo.robot_id for wo in members}
+            checklists = sorted({wo.policy.checklist_id for wo in members if wo.policy and wo.policy.checklist_id})
+            fields = {
+                "site_id": members[0].site_id,
+                "robot_id": robots.pop() if len(robots) == 1 else None,
+                "window_start": start,
+                "window_end": point,
+                "due_by": point,
+                "checklist_ids": checklists,
+            }
+
+            if not visit_ids:
+                new_visits.append((Visit(**fields), members))
+                continue
+
+            keep = next(wo.visit for wo in members if wo.visit_id == visit_ids[0])
+            kept.add(keep.id)
+            stale = any(getattr(keep, name) != value for name, value in fields.items())
+            if stale or any(wo.visit_id != keep.id or wo.due_by != point for wo in members):
+                for name, value in fields.items():
+                    setattr(keep, name, value)
+                keep.updated_at = now  # bulk_update skips auto_now
+                changed_visits.append((keep, members))
+
+    # Orders that left their visit (moved off its date, or no longer overlapping) lose the
+    # link; visits no group kept are deleted once nothing points at them.
+    detached = [wo.id for wo in orders if wo.visit_id is not None and wo.id not in grouped]
+    removed = {wo.visit_id for wo in orders if wo.visit_id is not None} - kept
+
+    summary["visits_created"] = len(new_visits)
+    summary["visits_updated"] = len(changed_visits)
+    summary["visits_removed"] = len(removed)
+    summary["orders_detached"] = len(detached)
+    summary["orders"] = sum(len(m) for _, m in new_visits) + sum(len(m) for _, m in changed_visits)
+    if dry_run or not (new_visits or changed_visits or detached or removed):
+        return summary
+
+    with transaction.atomic():
+        Visit.objects.bulk_create([visit for visit, _ in new_visits], batch_size=1000)
+        if changed_visits:
+            Visit.objects.bulk_update(
+                [visit for visit, _ in changed_visits],
+                ["robot", "window_start", "window_end", "due_by", "checklist_ids", "updated_at"],
+                batch_size=1000,
+            )
+        stamp = timezone.now()
+        if detached:
+            WorkOrder.objects.filter(id__in=detached).update(visit=None, updated_at=stamp)
+        for visit, members in new_visits + changed_visits:
+            # Members that move to the visit date also get their reminders re-armed.
+            WorkOrder.objects.filter(id__in=[wo.id for wo in members]).exclude(due_by=visit.due_by).update(
+                visit=visit, due_by=visit.due_by, last_reminder_days=None, updated_at=stamp
+            )
+            WorkOrder.objects.filter(id__in=[wo.id for wo in members], due_by=visit.due_by).update(
+                visit=visit, updated_at=stamp
+            )
+        if removed:
+            Visit.objects.filter(id__in=removed, work_orders__isnull=True).delete()
+    return summary
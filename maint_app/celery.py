@@ -1,6 +1,30 @@
+import logging
 import os
 from celery import Celery
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "maint_app.settings")
 app = Celery("maint_app")
 app.config_from_object("django.conf:settings", namespace="CELERY")
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
+
+log = logging.getLogger(__name__)
+
+
+def publish(task, args=(), fallback=None) -> None:
+    """
+    Queue `task` for a worker, or call `fallback()` in this process when there is no broker
+    (settings.TASKS_INLINE) or the publish fails. Meant for transaction.on_commit callbacks:
+    the publish skips the result store and is not retried, so a broker that is down costs
+    the short connect timeout from settings, not a stall in the request.
+    """
+    from django.conf import settings
+
+    if not settings.TASKS_INLINE:
+        try:
+            task.apply_async(args, retry=False, ignore_result=True)
+            return
+        except Exception:
+            if fallback is None:
+                raise
+            log.warning("could not publish %s; running it in-process", task.name, exc_info=True)
+    if fallback is not None:
+        fallback()
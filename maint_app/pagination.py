@@ -0,0 +1,117 @@
+"""
+Keyset (cursor) pagination for every DRF list endpoint.
+
+DRF's CursorPagination seeks on the first ordering field only and falls back to OFFSET
+for ties (capped at 1000), so pages inside a run of equal values get slower and then fail.
+Here the cursor carries the values of every ordering field and the next page is
+`WHERE (a, b) > (x, y)` spelled out as ORs, so any page costs what page one costs
+when an index matches the ordering.
+
+Views pick their ordering with `cursor_ordering`, e.g. ("due_by", "id"); fields must be
+non-null. A ?ordering= from OrderingFilter still wins, and "id" is appended to any
+ordering that does not end on a unique field.
+"""
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.utils.urls import remove_query_param
+
+
+def _reverse(ordering: tuple) -> tuple:
+    return tuple(field[1:] if field.startswith("-") else f"-{field}" for field in ordering)
+
+
+class KeysetPagination(CursorPagination):
+    ordering = ("id",)
+    page_size_query_param = "page_size"
+    max_page_size = getattr(settings, "API_MAX_PAGE_SIZE", 500)
+
+    def get_ordering(self, request, queryset, view):
+        self.ordering = tuple(getattr(view, "cursor_ordering", None) or type(self).ordering)
+        ordering = super().get_ordering(request, queryset, view)
+        last = queryset.model._meta.get_field(ordering[-1].lstrip("-"))
+        if not (last.unique or last.primary_key):
+            ordering += ("id",)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.fields = [queryset.model._meta.get_field(field.lstrip("-")) for field in self.ordering]
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+        position = self.cursor.position if self.cursor else None
+
+        ordering = _reverse(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(ordering, position))
+
+        results = list(queryset[: self.page_size + 1])
+        self.page = results[: self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def _after(self, ordering: tuple, position: list) -> Q:
+        """
+        Rows strictly after `position` in `ordering`: (a > x) | (a = x & b > y) | ...
+        The redundant leading `a >= x` lets the database seek the index instead of scanning it.
+        """
+        condition, equal = Q(), Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        first = ordering[0]
+        bound = Q(**{f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": position[0]})
+        return bound & condition
+
+    def _position(self, instance) -> str:
+        return json.dumps([field.value_to_string(instance) for field in self.fields])
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            # Stepped back past the start: page one again.
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self._position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # Stepped past the end: the last page.
+            return self.encode_cursor(Cursor(offset=0, reverse=True, position=None))
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self._position(self.page[0])))
+
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return cursor
+        try:
+            position = json.loads(cursor.position)
+            if not isinstance(position, list) or len(position) != len(self.fields):
+                raise ValueError(position)
+            position = [field.to_python(value) for field, value in zip(self.fields, position)]
+        except (ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(offset=0, reverse=cursor.reverse, position=position)
@@ -44,7 +44,7 @@ CSRF_TRUSTED_ORIGINS = [
 INSTALLED_APPS = [
     'apps.fleet',
     'apps.policies',
-    'apps.workorders',
+    'apps.workorders.apps.WorkordersConfig',
     'apps.checklists',
     'apps.calendarfeed',
     'apps.accounts',
@@ -104,6 +104,60 @@ DATABASES = {
     )
 }
 
+# Cache (shared across web/worker processes when REDIS_URL is set)
+REDIS_URL = os.environ.get("REDIS_URL", "")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# REST API: every list endpoint is keyset-paginated (see maint_app/pagination.py)
+REST_FRAMEWORK = {
+    "DEFAULT_PAGINATION_CLASS": "maint_app.pagination.KeysetPagination",
+    "PAGE_SIZE": int(os.environ.get("API_PAGE_SIZE", "100")),
+}
+API_MAX_PAGE_SIZE = int(os.environ.get("API_MAX_PAGE_SIZE", "500"))
+
+# Celery (chords need a result backend)
+CELERY_BROKER_URL = os.environ.get("CELERY_BROKER_URL", REDIS_URL or "redis://127.0.0.1:6379/0")
+CELERY_RESULT_BACKEND = os.environ.get("CELERY_RESULT_BACKEND", CELERY_BROKER_URL)
+# Publishing from a request gives up quickly when the broker is down (see maint_app.celery.publish)
+CELERY_BROKER_CONNECTION_TIMEOUT = 2
+CELERY_BROKER_TRANSPORT_OPTIONS = {"socket_connect_timeout": 2}
+# Condition excursion state lives in the evaluating process, so every batch goes to one
+# queue served by a single-process worker ("conditions" in Procfile / render.yaml)
+CELERY_TASK_ROUTES = {"apps.workorders.tasks.evaluate_condition_readings": {"queue": "conditions"}}
+# No CELERY_BROKER_URL / REDIS_URL means no worker: on-commit work (usage folding,
+# condition alerts, notification delivery) runs in-process instead of being queued
+TASKS_INLINE = not (os.environ.get("CELERY_BROKER_URL") or REDIS_URL)
+
+# Email (SMTP when EMAIL_HOST is set; otherwise printed to the console for dev)
+EMAIL_HOST = os.environ.get("EMAIL_HOST", "")
+EMAIL_PORT = int(os.environ.get("EMAIL_PORT", "587"))
+EMAIL_HOST_USER = os.environ.get("EMAIL_HOST_USER", "")
+EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD", "")
+EMAIL_USE_TLS = os.environ.get("EMAIL_USE_TLS", "True") == "True"
+EMAIL_TIMEOUT = 10
+EMAIL_BACKEND = (
+    "django.core.mail.backends.smtp.EmailBackend" if EMAIL_HOST
+    else "django.core.mail.backends.console.EmailBackend"
+)
+DEFAULT_FROM_EMAIL = os.environ.get("DEFAULT_FROM_EMAIL", "maintenance@localhost")
+
+# Notification email batches: messages per SMTP connection, connections in parallel
+NOTIFICATIONS_EMAIL_BATCH_SIZE = int(os.environ.get("NOTIFICATIONS_EMAIL_BATCH_SIZE", "50"))
+NOTIFICATIONS_EMAIL_CONCURRENCY = int(os.environ.get("NOTIFICATIONS_EMAIL_CONCURRENCY", "2"))
+
 
 
 
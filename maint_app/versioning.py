@@ -0,0 +1,20 @@
+"""
+Change fingerprints read from the database, shared by the in-process caches.
+
+A fingerprint is the row count of a queryset plus the newest value of its updated_at
+(auto_now) columns: adds and deletes move the count, saves move the timestamp, and every
+process computing it agrees. Bulk queryset.update() calls that skip updated_at, and saves
+that commit late with an updated_at older than one already counted, do not move it;
+callers bound those with a max age.
+"""
+from django.db.models import Count, Max
+
+
+def fingerprint(qs, *fields) -> tuple:
+    """
+    (count, newest value of each of `fields`) for `qs` in one aggregate query. `fields`
+    defaults to updated_at and may follow relations, e.g. "site__updated_at".
+    """
+    fields = fields or ("updated_at",)
+    agg = qs.order_by().aggregate(n=Count("id"), **{f"f{i}": Max(field) for i, field in enumerate(fields)})
+    return (agg["n"], *(agg[f"f{i}"] for i in range(len(fields))))